@@ -0,0 +1,247 @@
+"""
+Animated sticker support for LINE STORE Sticker Capture Tool.
+
+Animated, popup and sound sticker packs describe their native assets in the
+data-preview attribute of each sticker item on the product page. Instead of
+screenshotting whichever frame happens to be shown, these assets (APNG
+animations and sounds) are downloaded directly and in parallel. APNG frame
+counts and durations are read by streaming through the PNG chunks, and
+frames can optionally be extracted one at a time without holding the whole
+frame stack in memory.
+"""
+
+import html
+import io
+import json
+import logging
+import re
+import struct
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Set
+
+from config import ANIMATION_DOWNLOAD_WORKERS
+from http_cache import HttpCache, http_get
+
+logger = logging.getLogger(__name__)
+
+ANIMATION_DIRNAME = "animation"
+SOUND_DIRNAME = "sound"
+FRAMES_DIRNAME = "frames"
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_DATA_PREVIEW_PATTERN = re.compile(r"""data-preview=(?:'([^']*)'|"([^"]*)")""")
+
+COLLECT_PREVIEWS_JS = """() => Array.from(document.querySelectorAll('[data-preview]'))
+    .map(el => el.getAttribute('data-preview'))"""
+
+
+@dataclass
+class AnimatedAsset:
+    """Native assets of one sticker and, once downloaded, their bytes."""
+    index: int
+    sticker_id: Optional[str]
+    type: str
+    animation_url: Optional[str] = None
+    sound_url: Optional[str] = None
+    animation: Optional[bytes] = None
+    sound: Optional[bytes] = None
+    info: Dict[str, int] = field(default_factory=dict)
+
+
+def parse_previews(raw_previews: List[Optional[str]]) -> List[AnimatedAsset]:
+    """
+    Turn data-preview attribute values (in sticker order) into assets.
+    Static stickers are kept so positions line up with the screenshots.
+    """
+    assets = []
+    for index, raw in enumerate(raw_previews, 1):
+        try:
+            preview = json.loads(html.unescape(raw or "{}"))
+        except ValueError:
+            logger.debug(f"Unparseable data-preview for sticker {index}")
+            preview = {}
+        animation_url = preview.get("popupUrl") or preview.get("animationUrl") or None
+        assets.append(AnimatedAsset(
+            index=index,
+            sticker_id=str(preview["id"]) if preview.get("id") else None,
+            type=preview.get("type", "static"),
+            animation_url=animation_url,
+            sound_url=preview.get("soundUrl") or None,
+        ))
+    return assets
+
+
+def parse_previews_from_html(page_html: str) -> List[AnimatedAsset]:
+    """Extract assets from product page HTML without a browser."""
+    return parse_previews([m.group(1) or m.group(2) for m in _DATA_PREVIEW_PATTERN.finditer(page_html)])
+
+
+def collect_previews(page) -> List[AnimatedAsset]:
+    """Extract assets from a loaded Playwright page."""
+    return parse_previews(page.evaluate(COLLECT_PREVIEWS_JS))
+
+
+def is_animated_pack(assets: List[AnimatedAsset]) -> bool:
+    """True if any sticker has a native animation or sound asset."""
+    return any(asset.animation_url or asset.sound_url for asset in assets)
+
+
+def _get(url: str, cache: Optional[HttpCache]) -> bytes:
+    if cache is not None:
+        response = cache.fetch(url)
+        status, body = response.status, response.body
+    else:
+        status, _, body = http_get(url)
+    if status != 200:
+        raise OSError(f"HTTP {status} for {url}")
+    return body
+
+
+def download_assets(assets: List[AnimatedAsset], cache_dir: Optional[str] = None,
+                    workers: int = ANIMATION_DOWNLOAD_WORKERS) -> List[AnimatedAsset]:
+    """Download animation and sound files of all assets in parallel."""
+    cache = HttpCache(Path(cache_dir)) if cache_dir else None
+
+    def download(asset: AnimatedAsset) -> None:
+        # Each asset is fetched on its own so a broken animation does not cost the sound
+        if asset.animation_url:
+            try:
+                data = _get(asset.animation_url, cache)
+                asset.info = apng_info_from_bytes(data)
+                asset.animation = data
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                logger.warning(f"Failed to download animation of sticker {asset.index}: {e}")
+        if asset.sound_url:
+            try:
+                asset.sound = _get(asset.sound_url, cache)
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                logger.warning(f"Failed to download sound of sticker {asset.index}: {e}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(download, assets))
+    finally:
+        if cache is not None:
+            cache.close()
+
+    downloaded = sum(1 for asset in assets if asset.animation or asset.sound)
+    logger.info(f"🎞️  Downloaded native assets for {downloaded}/{len(assets)} stickers")
+    return assets
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated PNG file")
+    return data
+
+
+def read_apng_info(stream: BinaryIO) -> Dict[str, int]:
+    """
+    Read frame count, total duration and loop count of a PNG/APNG by
+    streaming through its chunks; image data is skipped, never decoded.
+    Raises ValueError for anything that is not a complete PNG.
+    """
+    if stream.read(8) != _PNG_SIGNATURE:
+        raise ValueError("Not a PNG file")
+
+    info = {"frame_count": 1, "duration_ms": 0, "loops": 0}
+    duration = 0.0
+    while True:
+        length, chunk_type = struct.unpack(">I4s", _read_exact(stream, 8))
+        if chunk_type == b"IEND":
+            _read_exact(stream, length + 4)
+            break
+        if chunk_type == b"acTL":
+            if length < 8:
+                raise ValueError("Invalid acTL chunk")
+            info["frame_count"], info["loops"] = struct.unpack(">II", _read_exact(stream, 8))
+            _read_exact(stream, length - 8 + 4)
+        elif chunk_type == b"fcTL":
+            if length < 26:
+                raise ValueError("Invalid fcTL chunk")
+            data = _read_exact(stream, length + 4)
+            delay_num, delay_den = struct.unpack(">HH", data[20:24])
+            duration += delay_num / (delay_den or 100)
+        else:
+            # Skip the chunk data and CRC, reading in bounded pieces to catch truncation
+            remaining = length + 4
+            while remaining:
+                remaining -= len(_read_exact(stream, min(remaining, 1 << 16)))
+    info["duration_ms"] = int(round(duration * 1000))
+    return info
+
+
+def apng_info_from_bytes(data: bytes) -> Dict[str, int]:
+    return read_apng_info(io.BytesIO(data))
+
+
+def extract_frames(apng_path: Path, frames_dir: Path) -> int:
+    """Write each APNG frame as a PNG, decoding one frame at a time."""
+    from PIL import Image
+
+    frames_dir.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with Image.open(apng_path) as img:
+        for frame_number in range(getattr(img, "n_frames", 1)):
+            img.seek(frame_number)
+            img.convert("RGBA").save(frames_dir / f"{frame_number:03d}.png")
+            count += 1
+    return count
+
+
+def animation_path(index: int) -> str:
+    return f"{ANIMATION_DIRNAME}/{index:04d}.png"
+
+
+def sound_path(index: int) -> str:
+    return f"{SOUND_DIRNAME}/{index:04d}.m4a"
+
+
+def frames_path(index: int) -> str:
+    return f"{FRAMES_DIRNAME}/{index:04d}"
+
+
+def metadata_entries(assets: List[AnimatedAsset], frames: bool = False) -> List[dict]:
+    """
+    The "animation" list of meta.json for the downloaded assets. File paths
+    are relative to the output directory, where write_assets puts them.
+    """
+    entries = []
+    for asset in assets:
+        if not asset.animation and not asset.sound:
+            continue
+        entry = {"index": asset.index, "sticker_id": asset.sticker_id, "type": asset.type}
+        if asset.animation:
+            entry.update({"file": animation_path(asset.index), "src": asset.animation_url, **asset.info})
+            if frames:
+                entry["frames_dir"] = frames_path(asset.index)
+        if asset.sound:
+            entry.update({"sound_file": sound_path(asset.index), "sound_src": asset.sound_url})
+        entries.append(entry)
+    return entries
+
+
+def write_assets(assets: List[AnimatedAsset], output_dir: Path,
+                 frames: bool = False) -> Set[int]:
+    """Write downloaded assets below output_dir. Returns the indices whose frames were extracted."""
+    extracted = set()
+    for asset in assets:
+        if asset.animation:
+            path = output_dir / animation_path(asset.index)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(asset.animation)
+            if frames:
+                try:
+                    extract_frames(path, output_dir / frames_path(asset.index))
+                    extracted.add(asset.index)
+                except Exception as e:
+                    logger.warning(f"Frame extraction failed for sticker {asset.index}: {e}")
+        if asset.sound:
+            path = output_dir / sound_path(asset.index)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(asset.sound)
+    return extracted
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Sprite-sheet (atlas) output for LINE STORE Sticker Capture Tool.
+
+Packs all stickers of a product into one atlas image, or a few when the
+pack does not fit within ATLAS_MAX_WIDTH x ATLAS_MAX_HEIGHT, so a viewer
+needs a single file open per pack. Stickers are laid out on shelves in
+sticker order and composited into a numpy canvas. atlas.json maps each
+sticker number to its atlas and rectangle (x, y, w, h) and source URL, and
+an atlas can be unpacked back into single 0001.png... files.
+"""
+
+import argparse
+import io
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import ATLAS_MAX_HEIGHT, ATLAS_MAX_WIDTH, ATLAS_PADDING_PX
+
+logger = logging.getLogger(__name__)
+
+ATLAS_INDEX_FILENAME = "atlas.json"
+ATLAS_VERSION = 1
+
+
+@dataclass
+class AtlasItem:
+    """One sticker to pack: its number, RGBA pixels and source URL."""
+    index: int
+    pixels: np.ndarray
+    src: Optional[str] = None
+
+
+def _decode(data: bytes) -> np.ndarray:
+    with Image.open(io.BytesIO(data)) as img:
+        return np.asarray(img.convert("RGBA"))
+
+
+def _encode(pixels: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, "RGBA").save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def layout(sizes: Sequence[Tuple[int, int]], max_width: int = ATLAS_MAX_WIDTH,
+           max_height: int = ATLAS_MAX_HEIGHT,
+           padding: int = ATLAS_PADDING_PX) -> List[Tuple[int, int, int]]:
+    """
+    Shelf layout of (width, height) rectangles in order.
+    Returns (atlas, x, y) per rectangle.
+    """
+    placements = []
+    atlas = x = y = shelf_height = 0
+    for width, height in sizes:
+        if width > max_width or height > max_height:
+            raise ValueError(f"Sticker of {width}x{height}px does not fit in a {max_width}x{max_height}px atlas")
+        if x > 0 and x + width > max_width:
+            # Start a new shelf
+            x = 0
+            y += shelf_height + padding
+            shelf_height = 0
+        if y + height > max_height:
+            # Start a new atlas
+            atlas += 1
+            x = y = shelf_height = 0
+        placements.append((atlas, x, y))
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+    return placements
+
+
+def pack(items: Sequence[AtlasItem], max_width: int = ATLAS_MAX_WIDTH,
+         max_height: int = ATLAS_MAX_HEIGHT) -> Tuple[List[np.ndarray], dict]:
+    """Composite items into atlas canvases. Returns (canvases, index)."""
+    items = sorted(items, key=lambda item: item.index)
+    sizes = [(item.pixels.shape[1], item.pixels.shape[0]) for item in items]
+    placements = layout(sizes, max_width, max_height)
+
+    # Size each canvas to the area actually used
+    extents: Dict[int, List[int]] = {}
+    for (width, height), (atlas, x, y) in zip(sizes, placements):
+        extent = extents.setdefault(atlas, [0, 0])
+        extent[0] = max(extent[0], x + width)
+        extent[1] = max(extent[1], y + height)
+    canvases = [np.zeros((extents[a][1], extents[a][0], 4), dtype=np.uint8) for a in sorted(extents)]
+
+    stickers = {}
+    for item, (width, height), (atlas, x, y) in zip(items, sizes, placements):
+        canvases[atlas][y:y + height, x:x + width] = item.pixels
+        stickers[str(item.index)] = {
+            "atlas": atlas,
+            "x": x,
+            "y": y,
+            "w": width,
+            "h": height,
+            "file": f"{item.index:04d}.png",
+            "src": item.src,
+        }
+
+    index = {
+        "version": ATLAS_VERSION,
+        "atlases": [
+            {"file": f"atlas_{a}.png", "width": canvas.shape[1], "height": canvas.shape[0]}
+            for a, canvas in enumerate(canvases)
+        ],
+        "stickers": stickers,
+    }
+    return canvases, index
+
+
+def load_items(output_dir: Path) -> Dict[int, AtlasItem]:
+    """Slice the stickers of an existing atlas back out, keyed by sticker number."""
+    index_path = Path(output_dir) / ATLAS_INDEX_FILENAME
+    if not index_path.exists():
+        return {}
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+
+    canvases = [_decode((Path(output_dir) / a["file"]).read_bytes()) for a in index["atlases"]]
+    items = {}
+    for key, entry in index["stickers"].items():
+        canvas = canvases[entry["atlas"]]
+        pixels = canvas[entry["y"]:entry["y"] + entry["h"], entry["x"]:entry["x"] + entry["w"]]
+        items[int(key)] = AtlasItem(int(key), pixels, entry.get("src"))
+    return items
+
+
+def write_atlas(stickers: Sequence, output_dir: Path, merge_existing: bool = False) -> dict:
+    """
+    Write StickerImage objects as atlas PNG(s) plus atlas.json in output_dir.
+    With merge_existing, stickers replace the same positions of the current
+    atlas and all other positions are kept.
+    """
+    output_dir = Path(output_dir)
+    items = {}
+    if merge_existing:
+        items = load_items(output_dir)
+        if not items:
+            # No atlas yet: start from the single PNG files of an earlier capture
+            items = {int(p.stem): AtlasItem(int(p.stem), _decode(p.read_bytes()))
+                     for p in output_dir.glob("[0-9][0-9][0-9][0-9].png")}
+    for sticker in stickers:
+        items[sticker.index] = AtlasItem(sticker.index, _decode(sticker.read()), sticker.src)
+
+    return save(list(items.values()), output_dir)
+
+
+def save(items: Sequence[AtlasItem], output_dir: Path) -> dict:
+    """Pack items and write the atlas PNG(s) and atlas.json to output_dir."""
+    canvases, index = pack(items)
+
+    # Remove atlases left over from a previous, larger layout
+    for stale in Path(output_dir).glob("atlas_*.png"):
+        stale.unlink()
+    for entry, canvas in zip(index["atlases"], canvases):
+        (Path(output_dir) / entry["file"]).write_bytes(_encode(canvas))
+    with open(Path(output_dir) / ATLAS_INDEX_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+
+    logger.info(f"🧩 Atlas saved: {len(index['stickers'])} stickers in {len(canvases)} image(s)")
+    return index
+
+
+def unpack(output_dir: Path, dest_dir: Optional[Path] = None) -> int:
+    """Write the stickers of an atlas back as single 0001.png... files."""
+    dest_dir = Path(dest_dir) if dest_dir else Path(output_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    items = load_items(output_dir)
+    for number, item in sorted(items.items()):
+        (dest_dir / f"{number:04d}.png").write_bytes(_encode(np.ascontiguousarray(item.pixels)))
+    logger.info(f"Unpacked {len(items)} stickers to {dest_dir}")
+    return len(items)
+
+
+def main():
+    """Pack captured PNG files into an atlas, or unpack an atlas into PNG files."""
+    parser = argparse.ArgumentParser(description="Pack or unpack sticker atlases")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = subparsers.add_parser("pack", help="Pack 0001.png... files of a directory into an atlas")
+    pack_parser.add_argument("dir", help="Product output directory")
+
+    unpack_parser = subparsers.add_parser("unpack", help="Unpack an atlas into 0001.png... files")
+    unpack_parser.add_argument("dir", help="Directory containing atlas.json")
+    unpack_parser.add_argument("-o", "--outdir", help="Destination directory (default: same directory)")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    directory = Path(args.dir)
+    if args.command == "pack":
+        files = sorted(directory.glob("[0-9][0-9][0-9][0-9].png"))
+        if not files:
+            logger.error(f"No sticker PNG files in {directory}")
+            sys.exit(1)
+        sources = {}
+        meta_path = directory / "meta.json"
+        if meta_path.exists():
+            with open(meta_path, encoding="utf-8") as f:
+                sources = {s["index"]: s.get("src") for s in json.load(f).get("stickers", [])}
+        items = [AtlasItem(int(p.stem), _decode(p.read_bytes()), sources.get(int(p.stem))) for p in files]
+        save(items, directory)
+    else:
+        if not (directory / ATLAS_INDEX_FILENAME).exists():
+            logger.error(f"No {ATLAS_INDEX_FILENAME} in {directory}")
+            sys.exit(1)
+        unpack(directory, Path(args.outdir) if args.outdir else None)
+
+
+if __name__ == "__main__":
+    main()
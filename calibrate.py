@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Browser engine calibration for LINE STORE Sticker Capture Tool.
+
+Runs the capture pipeline against a local fixture product page on each
+installed Playwright engine and measures browser launch, page load,
+lazy-load settle time and per-element screenshot latency. The fixture page
+and its sticker images are served through page routing, so calibration
+never touches the network and results only reflect the engine on this host.
+
+Results are stored in a JSON file and used by `--browser auto`, which
+launches the engine with the lowest estimated capture time and falls back
+to the next one when a launch fails.
+"""
+
+import argparse
+import io
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from playwright.sync_api import sync_playwright
+
+from config import CALIBRATION_ROUNDS, CALIBRATION_STICKERS
+from grab_stickers import (
+    PRODUCT_URL_PREFIX,
+    capture_sticker_images,
+    find_sticker_table,
+    launch_browser,
+)
+
+logger = logging.getLogger(__name__)
+
+BROWSER_ENGINES = ["chromium", "firefox", "webkit"]
+DEFAULT_RESULTS_PATH = Path.home() / ".line-stamp-capture" / "browser_calibration.json"
+CALIBRATION_VERSION = 1
+
+FIXTURE_URL = f"{PRODUCT_URL_PREFIX}0/ja"
+FIXTURE_IMAGE_PREFIX = "https://stickershop.line-scdn.net/calibration/"
+_STICKER_SIZE = 150
+
+SETTLE_JS = """() => Array.from(document.images).every(img => img.complete && img.naturalWidth > 0)"""
+
+
+def fixture_html(sticker_count: int) -> str:
+    """A product page with a grid of lazily loaded sticker images."""
+    items = "\n".join(
+        f'<li class="mdCMN09Li"><img class="mdCMN09Image" loading="lazy" '
+        f'width="{_STICKER_SIZE}" height="{_STICKER_SIZE}" src="{FIXTURE_IMAGE_PREFIX}{i}.png"></li>'
+        for i in range(1, sticker_count + 1)
+    )
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Calibration</title>
+<style>
+ul {{ display: flex; flex-wrap: wrap; list-style: none; margin: 0; padding: 0; width: 800px; }}
+li {{ margin: 10px; }}
+</style></head>
+<body><ul>
+{items}
+</ul></body></html>"""
+
+
+def fixture_images(sticker_count: int) -> Dict[str, bytes]:
+    """Distinct PNG images for the fixture page, keyed by URL."""
+    from PIL import Image, ImageDraw
+
+    images = {}
+    for i in range(1, sticker_count + 1):
+        img = Image.new("RGBA", (_STICKER_SIZE, _STICKER_SIZE), (255, 255, 255, 0))
+        draw = ImageDraw.Draw(img)
+        color = ((i * 67) % 256, (i * 131) % 256, (i * 197) % 256, 255)
+        draw.ellipse((10, 10, _STICKER_SIZE - 10, _STICKER_SIZE - 10), fill=color)
+        draw.text((_STICKER_SIZE // 2 - 8, _STICKER_SIZE // 2 - 6), str(i), fill=(0, 0, 0, 255))
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        images[f"{FIXTURE_IMAGE_PREFIX}{i}.png"] = buffer.getvalue()
+    return images
+
+
+def _serve_fixture(page, html: str, images: Dict[str, bytes]) -> None:
+    def handle(route) -> None:
+        url = route.request.url
+        if url == FIXTURE_URL:
+            route.fulfill(status=200, content_type="text/html; charset=utf-8", body=html)
+        elif url in images:
+            route.fulfill(status=200, content_type="image/png", body=images[url])
+        else:
+            route.abort()
+
+    page.route("**/*", handle)
+
+
+def measure_engine(playwright, browser_name: str, sticker_count: int, html: str,
+                   images: Dict[str, bytes], headless: bool = True) -> Dict[str, float]:
+    """One calibration round on one engine. Returns the measured seconds per stage."""
+    started = time.perf_counter()
+    browser = launch_browser(playwright, browser_name, headless)
+    launch = time.perf_counter() - started
+    try:
+        page = browser.new_page()
+        _serve_fixture(page, html, images)
+
+        started = time.perf_counter()
+        page.goto(FIXTURE_URL, wait_until="networkidle")
+        load = time.perf_counter() - started
+
+        # Scroll to the end of the grid and wait until every lazy image has decoded
+        started = time.perf_counter()
+        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        page.wait_for_function(SETTLE_JS, timeout=30000)
+        page.evaluate("window.scrollTo(0, 0)")
+        settle = time.perf_counter() - started
+
+        table = find_sticker_table(page)
+        started = time.perf_counter()
+        stickers = capture_sticker_images(table, page)
+        capture = time.perf_counter() - started
+        if len(stickers) != sticker_count:
+            raise RuntimeError(f"Captured {len(stickers)}/{sticker_count} fixture stickers")
+    finally:
+        browser.close()
+
+    return {
+        "launch": launch,
+        "load": load,
+        "settle": settle,
+        "screenshot_ms": capture / sticker_count * 1000,
+    }
+
+
+def estimate_seconds(result: Dict[str, float], sticker_count: int = CALIBRATION_STICKERS) -> float:
+    """Estimated capture time of a pack of sticker_count stickers from calibration results."""
+    return result["launch"] + result["load"] + result["settle"] + \
+        result["screenshot_ms"] / 1000 * sticker_count
+
+
+def calibrate(browsers: List[str], sticker_count: int = CALIBRATION_STICKERS,
+              rounds: int = CALIBRATION_ROUNDS, headless: bool = True) -> dict:
+    """Measure each engine over several rounds. Returns the calibration results (medians)."""
+    html = fixture_html(sticker_count)
+    images = fixture_images(sticker_count)
+    engines = {}
+    with sync_playwright() as p:
+        for name in browsers:
+            logger.info(f"⏱️  Calibrating {name} ({rounds} rounds, {sticker_count} stickers)...")
+            samples = []
+            try:
+                for _ in range(rounds):
+                    samples.append(measure_engine(p, name, sticker_count, html, images, headless))
+            except Exception as e:
+                logger.warning(f"{name}: calibration failed: {e}")
+                engines[name] = {"error": str(e)}
+                continue
+            result = {key: round(statistics.median(s[key] for s in samples), 3) for key in samples[0]}
+            result["estimated_seconds"] = round(estimate_seconds(result, sticker_count), 3)
+            engines[name] = result
+            logger.info(f"{name}: launch {result['launch']:.2f}s, load {result['load']:.2f}s, "
+                        f"settle {result['settle']:.2f}s, {result['screenshot_ms']:.0f}ms per sticker")
+
+    measured = [name for name in engines if "error" not in engines[name]]
+    return {
+        "version": CALIBRATION_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "host": platform.node(),
+        "stickers": sticker_count,
+        "rounds": rounds,
+        "engines": engines,
+        "ranking": sorted(measured, key=lambda name: engines[name]["estimated_seconds"]),
+    }
+
+
+def load_results(path: Path = DEFAULT_RESULTS_PATH) -> Optional[dict]:
+    """Stored calibration results, or None when there are none."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read browser calibration {path}: {e}")
+        return None
+
+
+def save_results(results: dict, path: Path = DEFAULT_RESULTS_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def ranked_browsers(path: Path = DEFAULT_RESULTS_PATH) -> List[str]:
+    """
+    Engines in the order --browser auto tries them: calibrated engines from
+    fastest to slowest, then the rest in default order.
+    """
+    results = load_results(path)
+    ranking = []
+    if results is None:
+        logger.info("No browser calibration found - run calibrate.py to pick the fastest engine")
+    elif results.get("host") != platform.node():
+        logger.info(f"Browser calibration was made on {results.get('host')} - ignoring it on this host")
+    else:
+        ranking = [name for name in results.get("ranking", []) if name in BROWSER_ENGINES]
+    return ranking + [name for name in BROWSER_ENGINES if name not in ranking]
+
+
+def main():
+    """Calibrate the installed browser engines and store the results."""
+    parser = argparse.ArgumentParser(
+        description="Measure capture speed of each browser engine for --browser auto"
+    )
+    parser.add_argument("--browsers", nargs="+", choices=BROWSER_ENGINES, default=BROWSER_ENGINES,
+                        help="Engines to calibrate (default: all)")
+    parser.add_argument("--stickers", type=int, default=CALIBRATION_STICKERS,
+                        help=f"Stickers on the fixture page (default: {CALIBRATION_STICKERS})")
+    parser.add_argument("--rounds", type=int, default=CALIBRATION_ROUNDS,
+                        help=f"Measurement rounds per engine (default: {CALIBRATION_ROUNDS})")
+    parser.add_argument("--output", default=str(DEFAULT_RESULTS_PATH),
+                        help=f"Results file (default: {DEFAULT_RESULTS_PATH})")
+    parser.add_argument("--no-headless", action="store_false", dest="headless",
+                        help="Run browsers in GUI mode")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    results = calibrate(args.browsers, max(1, args.stickers), max(1, args.rounds), args.headless)
+    if not results["ranking"]:
+        logger.error("No browser engine could be calibrated (run: playwright install)")
+        sys.exit(1)
+
+    save_results(results, Path(args.output))
+    logger.info(f"✅ Fastest engine: {results['ranking'][0]} (ranking: {', '.join(results['ranking'])})")
+    logger.info(f"Calibration saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
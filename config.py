@@ -45,4 +45,62 @@ POPUP_DISMISS_TIMEOUT_MS = 2000  # Maximum wait time for popup detection
 
 # Screenshot settings
 SCREENSHOT_TIMEOUT_MS = 10000    # Timeout for individual element screenshots
-SCROLL_TIMEOUT_MS = 5000         # Timeout for scrolling elements into view
\ No newline at end of file
+SCROLL_TIMEOUT_MS = 5000         # Timeout for scrolling elements into view
+
+# Perceptual hash index settings
+PHASH_CHANGE_THRESHOLD = 4       # Max Hamming distance for a re-captured sticker to count as unchanged
+PHASH_DUPLICATE_THRESHOLD = 6    # Max Hamming distance reported as a near-duplicate across products
+
+# Direct HTTP fetch settings
+HTTP_TIMEOUT_SECONDS = 30
+HTTP_USER_AGENT = "Mozilla/5.0 (compatible; line-stamp-capture/1.0)"
+
+# HTTP cache settings
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024           # Evict least recently used entries above this size
+HTTP_CACHE_IMMUTABLE_HOSTS = ("stickershop.line-scdn.net",)  # Versioned assets served without revalidation
+
+# Capture verification settings
+VERIFY_MIN_SIZE_PX = 20          # Images smaller than this in either dimension are undersized
+VERIFY_CLIP_RATIO = 0.9          # Images below this fraction of the pack's median size are clipped
+VERIFY_BLANK_FRACTION = 0.995    # Fraction of white/transparent pixels that makes an image blank
+VERIFY_UNIFORM_STD = 2.0         # Luminance standard deviation below which an image is uniform
+VERIFY_OVERLAY_DELTA = 40        # Border darkening vs. the pack median that indicates an overlay
+VERIFY_MAX_RECAPTURES = 2        # Targeted re-capture rounds for flagged stickers
+VERIFY_RECAPTURE_WAIT_MS = 1500  # Wait before re-capturing flagged stickers
+
+# Crawler settings
+CRAWL_MAX_PAGES = 100            # Maximum listing pages fetched per listing URL
+CRAWL_PAGE_DELAY_SECONDS = 1.0   # Pause between listing page requests
+
+# Tall viewport settings
+TALL_VIEWPORT_MAX_HEIGHT = 16000        # Larger grids fall back to scrolling (browser texture limits)
+TALL_VIEWPORT_MARGIN_PX = 100           # Extra space below the last sticker
+TALL_VIEWPORT_IMAGE_TIMEOUT_MS = 10000  # Wait for the network and all sticker images after resizing
+
+# Atlas output settings
+ATLAS_MAX_WIDTH = 4096           # Maximum width of one atlas image
+ATLAS_MAX_HEIGHT = 4096          # Packs exceeding this height are split over several atlases
+ATLAS_PADDING_PX = 2             # Transparent gap between stickers
+
+# Animated sticker settings
+ANIMATION_DOWNLOAD_WORKERS = 8   # Parallel downloads of native animation/sound assets
+
+# Rate limiter settings (shared by all threads and processes when enabled)
+RATE_LIMIT_DEFAULT_RPS = 2.0     # Requests per second for hosts without their own budget
+RATE_LIMIT_HOST_RPS = {          # Per-host budgets
+    "store.line.me": 1.0,
+    "stickershop.line-scdn.net": 10.0,
+}
+RATE_LIMIT_BURST = 5.0           # Requests allowed back to back after an idle period
+RATE_LIMIT_MIN_RPS = 0.05        # Lowest rate adaptive backoff will go to
+RATE_LIMIT_BACKOFF_FACTOR = 0.5  # Rate multiplier on 429/5xx or slow responses
+RATE_LIMIT_RECOVERY_STEP = 0.05  # Rate increase per successful response, up to the budget
+RATE_LIMIT_SLOW_SECONDS = 10.0   # Responses slower than this count as a throttling signal
+RATE_LIMIT_STATE_TTL_SECONDS = 3600  # Shared state of hosts unused for this long is discarded
+
+# Browser calibration settings (--browser auto)
+CALIBRATION_STICKERS = 40        # Stickers on the fixture page, about one typical pack
+CALIBRATION_ROUNDS = 3           # Measurement rounds per engine; the median is stored
+
+# Sticker element processing
+STICKER_WINDOW_SIZE = 50         # Elements refreshed and captured per window on large pages
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Catalog crawler for LINE STORE Sticker Capture Tool.
+
+Expands author, series and search listing pages into product IDs and feeds
+them into the capture pipeline as they are found. A persistent frontier
+keeps the set of product IDs already seen, so repeated crawls stop paging
+as soon as a listing page has nothing new, and products that were found but
+not yet captured are resumed on the next run.
+
+Listing pages are paginated with the `page` query parameter. A URL may
+instead contain a `{page}` placeholder, which also allows crawling local
+fixture pages such as file:///path/to/author_{page}.html.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+import urllib.error
+from pathlib import Path
+from typing import Iterator, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+from playwright.sync_api import sync_playwright
+
+from grab_stickers import (
+    PRODUCT_ID_PATTERN,
+    PRODUCT_URL_PREFIX,
+    CaptureError,
+    CaptureOptions,
+    capture_product,
+    launch_browser,
+)
+from http_cache import HttpCache, http_get
+import rate_limit
+from config import CRAWL_MAX_PAGES, CRAWL_PAGE_DELAY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+FRONTIER_FILENAME = "crawl_frontier.json"
+
+
+def listing_page_url(url: str, page: int) -> str:
+    """URL of the given 1-based page of a listing."""
+    if "{page}" in url:
+        return url.replace("{page}", str(page))
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    query["page"] = [str(page)]
+    return urlunparse(parsed._replace(query=urlencode(query, doseq=True)))
+
+
+def extract_product_ids(html: str) -> List[str]:
+    """Product IDs linked from a listing page, in page order without duplicates."""
+    ids = []
+    seen = set()
+    for product_id in PRODUCT_ID_PATTERN.findall(html):
+        if product_id not in seen:
+            seen.add(product_id)
+            ids.append(product_id)
+    return ids
+
+
+class Frontier:
+    """Persistent set of seen product IDs plus the queue still to be captured."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.seen = set()
+        self.pending: List[str] = []
+        if self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.seen = set(data.get("seen", []))
+                self.pending = list(data.get("pending", []))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read crawl frontier {self.path}: {e}")
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"seen": sorted(self.seen), "pending": self.pending}, f, indent=2)
+        tmp_path.replace(self.path)
+
+    def add(self, product_id: str) -> bool:
+        """Queue a product ID. Returns False if it was seen before."""
+        if product_id in self.seen:
+            return False
+        self.seen.add(product_id)
+        self.pending.append(product_id)
+        return True
+
+    def complete(self, product_id: str) -> None:
+        """Remove a processed product ID from the pending queue."""
+        if product_id in self.pending:
+            self.pending.remove(product_id)
+        self.save()
+
+
+class Crawler:
+    """Paginate listing URLs and yield newly discovered product IDs."""
+
+    def __init__(self, frontier: Frontier, cache: Optional[HttpCache] = None,
+                 max_pages: int = CRAWL_MAX_PAGES, page_delay: float = CRAWL_PAGE_DELAY_SECONDS,
+                 full: bool = False):
+        self.frontier = frontier
+        self.cache = cache
+        self.max_pages = max_pages
+        self.page_delay = page_delay
+        self.full = full
+
+    def fetch_listing(self, url: str) -> Optional[str]:
+        """Fetch a listing page, or None when it does not exist."""
+        try:
+            if self.cache is not None and url.startswith(("http://", "https://")):
+                response = self.cache.fetch(url)
+                status, body = response.status, response.body
+            else:
+                status, _, body = http_get(url)
+        except (urllib.error.URLError, OSError) as e:
+            logger.debug(f"Listing page unavailable: {url}: {e}")
+            return None
+        if status != 200:
+            return None
+        return body.decode("utf-8", errors="replace")
+
+    def crawl(self, listing_url: str) -> Iterator[str]:
+        """
+        Yield new product IDs from a listing, page by page.
+        Stops at the first empty page, or (unless full) the first page with nothing new.
+        """
+        for page in range(1, self.max_pages + 1):
+            url = listing_page_url(listing_url, page)
+            if page > 1 and self.page_delay > 0:
+                time.sleep(self.page_delay)
+
+            html = self.fetch_listing(url)
+            if html is None:
+                logger.info(f"Listing ended at page {page}: {listing_url}")
+                return
+
+            ids = extract_product_ids(html)
+            if not ids:
+                logger.info(f"No products on page {page}, listing complete")
+                return
+
+            new_ids = [product_id for product_id in ids if self.frontier.add(product_id)]
+            self.frontier.save()
+            logger.info(f"Page {page}: {len(ids)} products, {len(new_ids)} new")
+            yield from new_ids
+
+            if not new_ids and not self.full:
+                logger.info("No new products on this page - stopping (use --full to crawl all pages)")
+                return
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description="Crawl LINE STORE author/series/search listings and capture the products found",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python crawler.py "https://store.line.me/stickershop/author/12345/ja" --capture
+  python crawler.py "https://store.line.me/search/sticker/ja?q=cat" --list > products.txt
+  python crawler.py "file:///path/to/fixtures/author_{page}.html" --list
+        """
+    )
+    parser.add_argument("listings", nargs="+", help="Listing page URLs to crawl")
+    parser.add_argument("-o", "--outdir", default="output",
+                        help="Root output directory for captures and the frontier (default: ./output)")
+    parser.add_argument("--frontier", help=f"Frontier file (default: <outdir>/{FRONTIER_FILENAME})")
+    parser.add_argument("--capture", action="store_true",
+                        help="Capture each new product as soon as it is found")
+    parser.add_argument("--list", action="store_true",
+                        help="Print each new product URL to stdout as soon as it is found")
+    parser.add_argument("--full", action="store_true",
+                        help="Crawl all pages instead of stopping at the first page without new products")
+    parser.add_argument("--max-pages", type=int, default=CRAWL_MAX_PAGES,
+                        help=f"Maximum pages per listing (default: {CRAWL_MAX_PAGES})")
+    parser.add_argument("--page-delay", type=float, default=CRAWL_PAGE_DELAY_SECONDS,
+                        help=f"Seconds between listing page requests (default: {CRAWL_PAGE_DELAY_SECONDS})")
+    parser.add_argument("--cache-dir", help="Directory of the on-disk HTTP cache (default: no cache)")
+    parser.add_argument("--browser", choices=["chromium", "firefox", "webkit", "auto"], default="chromium",
+                        help="Browser to use for captures (default: chromium)")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="Throttle listing fetches and captures with per-host budgets shared by "
+                             "all running captures on this machine")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose debug logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    if args.rate_limit:
+        rate_limit.configure()
+
+    outdir = Path(args.outdir)
+    frontier = Frontier(Path(args.frontier) if args.frontier else outdir / FRONTIER_FILENAME)
+    cache = HttpCache(Path(args.cache_dir)) if args.cache_dir else None
+    crawler = Crawler(frontier, cache, args.max_pages, args.page_delay, args.full)
+
+    def discovered() -> Iterator[str]:
+        # Products found by an earlier, interrupted run come first
+        if frontier.pending:
+            logger.info(f"Resuming {len(frontier.pending)} pending products from the frontier")
+        yield from list(frontier.pending)
+        for listing in args.listings:
+            logger.info(f"Crawling listing: {listing}")
+            yield from crawler.crawl(listing)
+
+    counts = {"processed": 0, "failed": 0}
+
+    def process(browser) -> None:
+        for product_id in discovered():
+            url = f"{PRODUCT_URL_PREFIX}{product_id}/ja"
+            if args.list:
+                print(url, flush=True)
+            if browser is not None:
+                options = CaptureOptions(browser=args.browser, output_dir=str(outdir / product_id),
+                                         cache_dir=args.cache_dir)
+                try:
+                    capture_product(url, options, browser=browser)
+                except CaptureError as e:
+                    # Left pending so the next run retries it
+                    logger.warning(f"{product_id}: capture failed: {e}")
+                    counts["failed"] += 1
+                    continue
+                except Exception as e:
+                    # e.g. a page load timeout; one bad product must not stop the crawl
+                    logger.warning(f"{product_id}: unexpected capture error: {e}")
+                    counts["failed"] += 1
+                    continue
+            frontier.complete(product_id)
+            counts["processed"] += 1
+
+    try:
+        if args.capture:
+            with sync_playwright() as p:
+                browser = launch_browser(p, args.browser)
+                try:
+                    process(browser)
+                finally:
+                    browser.close()
+        else:
+            process(None)
+    except KeyboardInterrupt:
+        logger.info("Crawl interrupted - pending products will be resumed next run")
+        frontier.save()
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            logger.info(f"HTTP cache: {cache.stats()}")
+            cache.close()
+
+    logger.info(f"✅ Crawl complete: {counts['processed']} products processed, {counts['failed']} failed, "
+                f"{len(frontier.seen)} known in total")
+
+
+if __name__ == "__main__":
+    main()
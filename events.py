@@ -0,0 +1,83 @@
+"""
+JSON-lines event stream for LINE STORE Sticker Capture Tool.
+
+With `grab_stickers.py --events jsonl` the capture pipeline writes one JSON
+object per line to stdout as things happen, while log lines stay on stderr.
+Frontends and orchestrators can follow a capture, and start work on each
+sticker as it arrives, without scraping logs.
+
+Every event has the fields `v` (schema version), `event` (type) and `ts`
+(Unix time in seconds). Events emitted during a capture also carry
+`product_id`, and events from an extra tab carry `tab`. Event types:
+
+- capture_start: url
+- phase_start: phase
+- phase_end: phase, seconds
+- element_found: index, total, src, bbox ([x, y, width, height] in page pixels)
+- sticker_captured: index, bytes, src
+- sticker_written: index, path, bytes (right after capture; again if re-captured)
+- file_written: kind ("atlas", "metadata", "index"), path, bytes
+- retry: index, reason
+- error: message, fatal, and index when it concerns one sticker
+- capture_end: captured, failed, seconds, output_dir
+
+New fields may be added to an event type; existing fields are not renamed
+or removed without bumping EVENTS_VERSION.
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, TextIO
+
+EVENTS_VERSION = 1
+
+
+class EventStream:
+    """Thread-safe writer of JSON-lines events."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event_type: str, fields: dict) -> None:
+        event = {"v": EVENTS_VERSION, "event": event_type, "ts": round(time.time(), 3), **fields}
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+_stream: Optional[EventStream] = None
+_context = threading.local()
+
+
+def configure(stream: TextIO = sys.stdout) -> EventStream:
+    """Enable the process-wide event stream."""
+    global _stream
+    _stream = EventStream(stream)
+    return _stream
+
+
+def enabled() -> bool:
+    return _stream is not None
+
+
+def emit(event_type: str, **fields) -> None:
+    """Emit an event, with the fields bound to the current thread. No-op when disabled."""
+    if _stream is None:
+        return
+    _stream.emit(event_type, {**getattr(_context, "fields", {}), **fields})
+
+
+@contextmanager
+def bound(**fields):
+    """Add fields to every event emitted by the current thread within the block."""
+    previous = getattr(_context, "fields", {})
+    _context.fields = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _context.fields = previous
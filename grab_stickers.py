@@ -10,36 +10,258 @@ License: MIT (code only - sticker images remain copyrighted by LINE/creators)
 """
 
 import argparse
+import array
 import json
 import logging
+import queue
 import re
 import sys
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 from urllib.parse import urlparse, parse_qs
 
-from playwright.sync_api import sync_playwright, Page, Browser, TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import sync_playwright, Page, Browser, BrowserContext, TimeoutError as PlaywrightTimeoutError
 
 from line_selectors import STICKER_SELECTORS, STICKER_XPATH_SELECTORS
-from config import POPUP_CLOSE_SELECTORS, POPUP_DISMISS_TIMEOUT_MS, SCREENSHOT_TIMEOUT_MS, SCROLL_TIMEOUT_MS
+from config import (
+    POPUP_CLOSE_SELECTORS, POPUP_DISMISS_TIMEOUT_MS, SCREENSHOT_TIMEOUT_MS, SCROLL_TIMEOUT_MS,
+    HTTP_CACHE_MAX_BYTES, VERIFY_MAX_RECAPTURES, VERIFY_RECAPTURE_WAIT_MS,
+    TALL_VIEWPORT_MAX_HEIGHT, TALL_VIEWPORT_MARGIN_PX, TALL_VIEWPORT_IMAGE_TIMEOUT_MS,
+    STICKER_WINDOW_SIZE,
+)
+from http_cache import HttpCache
+import events
+import rate_limit
 
 __version__ = "1.0.0"
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 logger = logging.getLogger(__name__)
 
+PRODUCT_URL_PREFIX = "https://store.line.me/stickershop/product/"
+PRODUCT_ID_PATTERN = re.compile(r'/stickershop/product/(\d+)/')
+
+
+class CaptureError(Exception):
+    """Raised when a product cannot be captured."""
+
+
+@dataclass
+class CaptureOptions:
+    """Options for a single product capture."""
+    lang: Optional[str] = None
+    delay: float = 2.0
+    headless: bool = True
+    browser: str = "chromium"
+    manual_popup: bool = False
+    manual_wait: int = 30
+    output_dir: Optional[str] = None  # Disk sink; None keeps the capture in memory only
+    refresh: bool = False  # Re-capture only positions changed since the index in output_dir
+    cache_dir: Optional[str] = None  # On-disk HTTP cache used by the capture browser
+    cache_max_bytes: int = HTTP_CACHE_MAX_BYTES
+    verify: bool = False  # Check captures for blank/clipped/overlay images and re-capture them
+    tall_viewport: bool = False  # Resize the viewport to fit the whole grid instead of scrolling
+    tabs: int = 1  # Split the capture of one product across this many tabs
+    output_format: str = "files"  # "files" (0001.png...), "atlas" (atlas_N.png + atlas.json) or "both"
+    animated: str = "off"  # "add" native animation assets to screenshots, or capture "only" those
+    extract_frames: bool = False  # Also write every animation frame as a PNG
+
+
+@dataclass
+class StickerImage:
+    """
+    A captured sticker: its position on the page and PNG bytes. Once a disk
+    sink has written it, data is released and path points to the file.
+    """
+    index: int
+    data: Optional[bytes]
+    src: Optional[str] = None
+    etag: Optional[str] = None
+    status: Optional[str] = None  # "ok" or "flagged" once verified
+    flags: List[str] = field(default_factory=list)
+    phash: Optional[str] = None
+    path: Optional[Path] = None
+
+    @property
+    def filename(self) -> str:
+        return f"{self.index:04d}.png"
+
+    def read(self) -> bytes:
+        """PNG bytes, from memory or from the written file."""
+        return self.data if self.data is not None else self.path.read_bytes()
+
+
+# Per-element state in StickerTable.status
+STATUS_PENDING, STATUS_CAPTURED, STATUS_FAILED, STATUS_SKIPPED = range(4)
+STATUS_NAMES = ("pending", "captured", "failed", "skipped")
+
+# One row per element: [src, x, y, width, height, visible], in page coordinates.
+# On LINE STORE the sticker element is a span.mdCMN09Image whose image is a CSS
+# background, so src falls back to background-image and the data-preview staticUrl.
+DESCRIBE_ELEMENTS_JS = """(elements, positions) => {
+    const imageUrl = (el) => {
+        if (el.getAttribute('src')) return el.getAttribute('src');
+        const match = getComputedStyle(el).backgroundImage.match(/url\\(["']?(.*?)["']?\\)/);
+        if (match && match[1]) return match[1];
+        const item = el.closest('[data-preview]');
+        try {
+            return item ? JSON.parse(item.getAttribute('data-preview')).staticUrl || null : null;
+        } catch (e) {
+            return null;
+        }
+    };
+    const rows = [];
+    for (const i of positions ?? elements.keys()) {
+        const el = elements[i];
+        if (!el) { rows.push([null, 0, 0, 0, 0, false]); continue; }
+        const r = el.getBoundingClientRect();
+        rows.push([imageUrl(el), r.left + window.scrollX, r.top + window.scrollY,
+                   r.width, r.height, r.width > 0 && r.height > 0 && getComputedStyle(el).visibility !== 'hidden']);
+    }
+    return rows;
+}"""
+
+# Waits until the image of every sticker element has loaded: an <img>, an <img> inside the
+# element, or a CSS background image (re-requested through Image(), which hits the browser
+# cache once the background has loaded). Returns the number that failed, or -1 on timeout.
+STICKER_IMAGES_LOADED_JS = """async ([selectors, timeout]) => {
+    let elements = [];
+    for (const selector of selectors) {
+        elements = Array.from(document.querySelectorAll(selector));
+        if (elements.length) break;
+    }
+    const loaded = (img) => new Promise(resolve => {
+        if (img.complete) return resolve(img.naturalWidth > 0);
+        img.addEventListener('load', () => resolve(true), {once: true});
+        img.addEventListener('error', () => resolve(false), {once: true});
+    });
+    const waitFor = (el) => {
+        const img = el.tagName === 'IMG' ? el : el.querySelector('img');
+        if (img) return loaded(img);
+        const match = getComputedStyle(el).backgroundImage.match(/url\\(["']?(.*?)["']?\\)/);
+        if (!match || !match[1]) return Promise.resolve(false);
+        const probe = new Image();
+        probe.src = match[1];
+        return loaded(probe);
+    };
+    const timer = new Promise(resolve => setTimeout(() => resolve(null), timeout));
+    const results = await Promise.race([Promise.all(elements.map(waitFor)), timer]);
+    return results === null ? -1 : results.filter(ok => !ok).length;
+}"""
+
+# RGB of the first opaque background behind an element, i.e. the page colour a sticker is shown on
+ELEMENT_BACKGROUND_JS = """(el) => {
+    for (let node = el.parentElement; node; node = node.parentElement) {
+        const rgba = (getComputedStyle(node).backgroundColor.match(/[\\d.]+/g) || []).map(Number);
+        if (rgba.length >= 3 && (rgba.length < 4 || rgba[3] > 0)) return rgba.slice(0, 3);
+    }
+    return [255, 255, 255];
+}"""
+
+
+@dataclass
+class StickerTable:
+    """
+    Compact model of the sticker elements on a page, with one column per field.
+    Filled by a single in-page query; element locators are only created for
+    the window being captured. A table can also be built from an existing
+    list of locators, which are then described one by one.
+    """
+    selector: str
+    src: List[Optional[str]] = field(default_factory=list)
+    bbox: array.array = field(default_factory=lambda: array.array("d"))  # x, y, w, h per element
+    visible: bytearray = field(default_factory=bytearray)
+    status: bytearray = field(default_factory=bytearray)
+    locators: Optional[list] = None  # only for tables built by from_locators()
+
+    @classmethod
+    def query(cls, page: Page, selector: str) -> "StickerTable":
+        table = cls(selector)
+        table._fill(page.locator(selector).evaluate_all(DESCRIBE_ELEMENTS_JS))
+        return table
+
+    @classmethod
+    def from_locators(cls, locators: list) -> "StickerTable":
+        """Table over a list of element locators, e.g. from find_sticker_elements()."""
+        table = cls("", locators=list(locators))
+        table._fill(table._describe_locators(range(1, len(table.locators) + 1)))
+        return table
+
+    def _fill(self, rows: list) -> None:
+        for src, x, y, width, height, visible in rows:
+            self.src.append(src)
+            self.bbox.extend((x, y, width, height))
+            self.visible.append(bool(visible))
+        self.status = bytearray(len(self.src))
+
+    def _describe_locators(self, positions) -> list:
+        rows = []
+        for i in positions:
+            described = self.locators[i - 1].evaluate_all(DESCRIBE_ELEMENTS_JS)
+            rows.append(described[0] if described else [None, 0, 0, 0, 0, False])
+        return rows
+
+    def __len__(self) -> int:
+        return len(self.src)
+
+    def refresh(self, page: Page, positions: List[int]) -> None:
+        """Re-read src, bbox and visibility of the given 1-based positions in one query."""
+        if self.locators is not None:
+            rows = self._describe_locators(positions)
+        else:
+            rows = page.locator(self.selector).evaluate_all(DESCRIBE_ELEMENTS_JS, [i - 1 for i in positions])
+        for i, (src, x, y, width, height, visible) in zip(positions, rows):
+            self.src[i - 1] = src
+            self.bbox[4 * (i - 1):4 * i] = array.array("d", (x, y, width, height))
+            self.visible[i - 1] = bool(visible)
+
+    def locator(self, page: Page, position: int):
+        """Locator of the element at a 1-based position."""
+        if self.locators is not None:
+            return self.locators[position - 1]
+        return page.locator(self.selector).nth(position - 1)
+
+    def bounding_box(self, position: int) -> Tuple[float, float, float, float]:
+        return tuple(self.bbox[4 * (position - 1):4 * position])
+
+    def counts(self) -> Dict[str, int]:
+        """Number of elements per status name, e.g. for the capture metrics."""
+        return {name: self.status.count(code) for code, name in enumerate(STATUS_NAMES)}
+
+
+@dataclass
+class CaptureResult:
+    """Result of capture_product(): ordered stickers, metadata and metrics."""
+    product_id: str
+    source_url: str
+    stickers: List[StickerImage] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    popup_closed: bool = True
+    index: Optional[Any] = None  # sticker_index.StickerIndex, when available
+    animations: List[Any] = field(default_factory=list)  # animated.AnimatedAsset, for animated packs
+
+
+def _import_sticker_index():
+    """Import the perceptual hash index module, or None if numpy/Pillow are missing."""
+    try:
+        import sticker_index
+        return sticker_index
+    except ImportError as e:
+        logger.debug(f"Sticker index unavailable: {e}")
+        return None
+
 
 def extract_product_id(url: str) -> Optional[str]:
     """Extract product ID from LINE STORE URL."""
     try:
         # Pattern: https://store.line.me/stickershop/product/{product_id}/ja
-        match = re.search(r'/stickershop/product/(\d+)/', url)
+        match = PRODUCT_ID_PATTERN.search(url)
         if match:
             return match.group(1)
         return None
@@ -192,7 +414,7 @@ def wait_for_manual_popup_dismissal(page: Page, wait_seconds: int, original_url:
                 
                 # Verify we're still on the correct page after cleanup
                 current_url = page.url
-                if not current_url.startswith("https://store.line.me/stickershop/product/"):
+                if not current_url.startswith(PRODUCT_URL_PREFIX):
                     logger.warning(f"Page redirected during cleanup to: {current_url}")
                     logger.info("Returning to original sticker page...")
                     page.goto(original_url, wait_until="networkidle")
@@ -448,7 +670,7 @@ def dismiss_popup(page: Page, original_url: str) -> bool:
     
     # Final check - ensure we're still on the right page
     final_url = page.url
-    if not final_url.startswith("https://store.line.me/stickershop/product/"):
+    if not final_url.startswith(PRODUCT_URL_PREFIX):
         logger.warning(f"URL changed unexpectedly: {final_url}")
         logger.info(f"Returning to original sticker page: {original_url}")
         page.goto(original_url, wait_until="networkidle")
@@ -537,18 +759,106 @@ def ensure_all_content_loaded(page: Page) -> None:
         # Continue anyway - partial loading is better than none
 
 
-def find_sticker_elements(page: Page) -> list:
-    """Find all sticker image elements on the page."""
-    elements = []
+def expand_viewport_to_content(page: Page, max_height: int = TALL_VIEWPORT_MAX_HEIGHT) -> bool:
+    """
+    Resize the viewport so the whole sticker grid is inside it, letting all lazy
+    images load at once and making every element visible without scrolling.
+    Returns False (viewport unchanged) when the grid is taller than max_height.
+    """
+    logger.info("📐 Measuring sticker grid for tall viewport...")
+    
+    measure_js = """(selectors) => {
+        for (const selector of selectors) {
+            const elements = document.querySelectorAll(selector);
+            if (elements.length) {
+                let bottom = 0;
+                for (const el of elements) {
+                    bottom = Math.max(bottom, el.getBoundingClientRect().bottom + window.scrollY);
+                }
+                return bottom;
+            }
+        }
+        return document.body.scrollHeight;
+    }"""
+    
+    # Count requests in flight so the wait below covers whatever the resize triggers
+    in_flight = set()
+    on_request = in_flight.add
+    on_done = in_flight.discard
+    page.on("request", on_request)
+    page.on("requestfinished", on_done)
+    page.on("requestfailed", on_done)
+    try:
+        viewport = page.viewport_size or {"width": 1280, "height": 720}
+        height = viewport["height"]
+        
+        # The grid can grow once lazy content appears, so measure until it is stable
+        for _ in range(3):
+            grid_bottom = int(page.evaluate(measure_js, STICKER_SELECTORS)) + TALL_VIEWPORT_MARGIN_PX
+            if grid_bottom <= height:
+                break
+            if grid_bottom > max_height:
+                logger.info(f"Sticker grid is {grid_bottom}px tall (limit {max_height}px) - falling back to scrolling")
+                page.set_viewport_size(viewport)
+                return False
+            
+            height = grid_bottom
+            logger.debug(f"Resizing viewport to {viewport['width']}x{height}")
+            page.set_viewport_size({"width": viewport["width"], "height": height})
+            page.evaluate("window.scrollTo(0, 0)")
+            _wait_for_network_idle(page, in_flight, TALL_VIEWPORT_IMAGE_TIMEOUT_MS)
+        
+        # Lazy images may start loading only now, also when the grid already fitted
+        _wait_for_network_idle(page, in_flight, TALL_VIEWPORT_IMAGE_TIMEOUT_MS)
+        missing = page.evaluate(STICKER_IMAGES_LOADED_JS, [STICKER_SELECTORS, TALL_VIEWPORT_IMAGE_TIMEOUT_MS])
+        if missing == -1:
+            logger.warning("Sticker images did not finish loading in the tall viewport - falling back to scrolling")
+            page.set_viewport_size(viewport)
+            return False
+        if missing:
+            logger.warning(f"⚠️  {missing} sticker image(s) failed to load")
+        
+        logger.info(f"✅ Viewport expanded to {viewport['width']}x{height}px - no scrolling needed")
+        return True
+        
+    except Exception as e:
+        logger.warning(f"Tall viewport setup failed: {e}")
+        return False
+    finally:
+        page.remove_listener("request", on_request)
+        page.remove_listener("requestfinished", on_done)
+        page.remove_listener("requestfailed", on_done)
+
+
+def _wait_for_network_idle(page: Page, in_flight: set, timeout_ms: int, quiet_ms: int = 500) -> None:
+    """
+    Wait until no request tracked in in_flight has been pending for quiet_ms.
+    Unlike wait_for_load_state("networkidle"), this also works after the page has loaded.
+    """
+    deadline = time.perf_counter() + timeout_ms / 1000
+    quiet_since = None
+    while time.perf_counter() < deadline:
+        if in_flight:
+            quiet_since = None
+        elif quiet_since is None:
+            quiet_since = time.perf_counter()
+        elif time.perf_counter() - quiet_since >= quiet_ms / 1000:
+            return
+        page.wait_for_timeout(100)
+    logger.debug("Network did not become idle within the timeout")
+
+
+def find_sticker_table(page: Page) -> StickerTable:
+    """Find all sticker image elements on the page and describe them in one query."""
     
     # Debug: Check current page state
     logger.debug(f"Current page URL: {page.url}")
     logger.debug(f"Page title: {page.title()}")
     
     # Verify we're on the correct sticker page
-    if not page.url.startswith("https://store.line.me/stickershop/product/"):
+    if not page.url.startswith(PRODUCT_URL_PREFIX):
         logger.error(f"Not on a sticker product page! Current URL: {page.url}")
-        return []
+        return StickerTable("")
     
     # Wait for the main content to be visible
     try:
@@ -573,7 +883,7 @@ def find_sticker_elements(page: Page) -> list:
             
             if count > 0:
                 logger.info(f"Found {count} elements with selector: {selector}")
-                return [locator.nth(i) for i in range(count)]
+                return StickerTable.query(page, selector)
         except Exception as e:
             logger.debug(f"CSS selector '{selector}' failed: {e}")
     
@@ -588,7 +898,7 @@ def find_sticker_elements(page: Page) -> list:
             
             if count > 0:
                 logger.info(f"Found {count} elements with XPath: {xpath}")
-                return [locator.nth(i) for i in range(count)]
+                return StickerTable.query(page, f"xpath={xpath}")
         except Exception as e:
             logger.debug(f"XPath selector '{xpath}' failed: {e}")
     
@@ -610,7 +920,7 @@ def find_sticker_elements(page: Page) -> list:
             logger.debug(f"Sticker-specific selector '{alt_selector}': {alt_count} elements")
             if alt_count > 0:
                 logger.info(f"Found {alt_count} elements with sticker-specific selector: {alt_selector}")
-                return [page.locator(alt_selector).nth(i) for i in range(alt_count)]
+                return StickerTable.query(page, alt_selector)
         except Exception as e:
             logger.debug(f"Sticker-specific selector '{alt_selector}' failed: {e}")
     
@@ -630,93 +940,193 @@ def find_sticker_elements(page: Page) -> list:
     except Exception as e:
         logger.debug(f"Debug image search failed: {e}")
     
-    return elements
+    return StickerTable("")
+
 
+def find_sticker_elements(page: Page) -> list:
+    """Find all sticker image elements on the page as a list of locators."""
+    table = find_sticker_table(page)
+    return [table.locator(page, i) for i in range(1, len(table) + 1)]
 
-def capture_sticker_screenshots(elements: list, output_dir: Path, page: Page) -> int:
-    """Capture screenshots of all sticker elements with enhanced error handling."""
-    captured_count = 0
-    total_elements = len(elements)
+
+def capture_sticker_images(table: Union[StickerTable, list], page: Page,
+                           only: Optional[Set[int]] = None,
+                           scroll: bool = True,
+                           sink: Optional[Callable[[StickerImage], None]] = None) -> List[StickerImage]:
+    """
+    Capture all sticker elements as in-memory PNG bytes with enhanced error handling.
+    Elements that cannot be made visible or captured are skipped. When only is
+    given, just those 1-based positions are captured. With scroll=False (tall
+    viewport) invisible elements are skipped without scroll attempts.
+    
+    Positions are processed in windows of STICKER_WINDOW_SIZE: the visibility
+    and src of a window are refreshed in one in-page query, and locators exist
+    only for the window being captured. The outcome of each position is kept
+    in table.status. Each captured sticker is passed to sink right away.
+    A plain list of element locators is accepted as well.
+    """
+    if not isinstance(table, StickerTable):
+        table = StickerTable.from_locators(table)
+    stickers: List[StickerImage] = []
+    positions = [i for i in range(1, len(table) + 1) if only is None or i in only]
+    total_elements = len(positions)
     
     logger.info(f"📸 Starting capture of {total_elements} sticker elements...")
     
-    for i, element in enumerate(elements, 1):
+    for start in range(0, total_elements, STICKER_WINDOW_SIZE):
+        window = positions[start:start + STICKER_WINDOW_SIZE]
         try:
-            filename = f"{i:04d}.png"
-            filepath = output_dir / filename
-            
-            # Progress reporting
-            if i % 10 == 0 or i <= 5:
-                logger.info(f"📸 Processing element {i}/{total_elements}...")
-            
-            # Enhanced visibility checks
-            try:
-                # Check if element is visible before attempting screenshot
+            table.refresh(page, window)
+        except Exception as e:
+            logger.debug(f"Window refresh failed, using the initial table: {e}")
+        
+        for done, i in enumerate(window, start + 1):
+            table.status[i - 1] = _capture_position(table, page, i, stickers, scroll, done, total_elements)
+            if sink is not None and table.status[i - 1] == STATUS_CAPTURED:
+                sink(stickers[-1])
+    
+    captured_count = len(stickers)
+    success_rate = (captured_count / total_elements * 100) if total_elements > 0 else 0
+    logger.info(f"✅ Capture complete: {captured_count}/{total_elements} images ({success_rate:.1f}% success rate)")
+    return stickers
+
+
+def _capture_position(table: StickerTable, page: Page, i: int, stickers: List[StickerImage],
+                      scroll: bool, done: int, total_elements: int) -> int:
+    """
+    Capture the element at position i into stickers; done counts the positions
+    processed so far in this call. Returns the new table status of position i.
+    """
+    element = table.locator(page, i)
+    src = table.src[i - 1]
+    try:
+        # Progress reporting
+        if done % 10 == 0 or done <= 5:
+            logger.info(f"📸 Processing element {done}/{total_elements} (position {i})...")
+        
+        # Enhanced visibility checks
+        try:
+            # Visibility comes from the window query; only invisible elements cost extra round trips
+            is_visible = bool(table.visible[i - 1])
+            if not is_visible and scroll:
+                logger.debug(f"Element {i} not visible, attempting scroll...")
+                
+                # Try scrolling to element
+                element.scroll_into_view_if_needed(timeout=3000)
+                page.wait_for_timeout(500)  # Wait for scroll to complete
+                
+                # Re-check visibility after scroll
                 is_visible = element.is_visible()
                 if not is_visible:
-                    logger.debug(f"Element {i} not visible, attempting scroll...")
-                    
-                    # Try scrolling to element
-                    element.scroll_into_view_if_needed(timeout=3000)
-                    page.wait_for_timeout(500)  # Wait for scroll to complete
+                    logger.debug(f"Element {i} still not visible after scroll, trying force scroll...")
                     
-                    # Re-check visibility after scroll
-                    is_visible = element.is_visible()
-                    if not is_visible:
-                        logger.debug(f"Element {i} still not visible after scroll, trying force scroll...")
-                        
-                        # Get element position and scroll manually
-                        try:
-                            bbox = element.bounding_box()
-                            if bbox:
-                                page.evaluate(f"window.scrollTo(0, {bbox['y'] - 100})")
-                                page.wait_for_timeout(800)
-                                is_visible = element.is_visible()
-                        except:
-                            pass
+                    # Scroll manually to the recorded element position
+                    try:
+                        _, y, _, _ = table.bounding_box(i)
+                        page.evaluate(f"window.scrollTo(0, {y - 100})")
+                        page.wait_for_timeout(800)
+                        is_visible = element.is_visible()
+                    except:
+                        pass
+            
+            if not is_visible:
+                logger.warning(f"Element {i} remains invisible, skipping...")
+                events.emit("error", index=i, message="element not visible", fatal=False)
+                return STATUS_SKIPPED
                 
-                if not is_visible:
-                    logger.warning(f"Element {i} remains invisible, skipping...")
-                    continue
-                    
-            except Exception as visibility_e:
-                logger.debug(f"Visibility check failed for element {i}: {visibility_e}")
-                # Continue anyway - try to capture
+        except Exception as visibility_e:
+            logger.debug(f"Visibility check failed for element {i}: {visibility_e}")
+            # Continue anyway - try to capture
+        
+        # Attempt screenshot with reduced timeout for faster processing
+        try:
+            data = element.screenshot(timeout=5000)
+            logger.debug(f"Captured element {i}")
+            stickers.append(StickerImage(index=i, data=data, src=src))
+            events.emit("sticker_captured", index=i, bytes=len(data), src=src)
             
-            # Attempt screenshot with reduced timeout for faster processing
+        except Exception as screenshot_e:
+            # If screenshot fails, try one more time with page scroll
+            logger.debug(f"Screenshot failed for element {i}, retrying with scroll: {screenshot_e}")
+            events.emit("retry", index=i, reason=f"screenshot failed: {screenshot_e}")
             try:
-                element.screenshot(path=str(filepath), timeout=5000)
-                logger.debug(f"Captured: {filename}")
-                captured_count += 1
+                # Scroll to element again and wait
+                element.scroll_into_view_if_needed(timeout=2000)
+                page.wait_for_timeout(1000)
                 
-            except Exception as screenshot_e:
-                # If screenshot fails, try one more time with page scroll
-                logger.debug(f"Screenshot failed for element {i}, retrying with scroll: {screenshot_e}")
-                try:
-                    # Scroll to element again and wait
-                    element.scroll_into_view_if_needed(timeout=2000)
-                    page.wait_for_timeout(1000)
-                    
-                    # Retry screenshot
-                    element.screenshot(path=str(filepath), timeout=3000)
-                    logger.debug(f"Captured on retry: {filename}")
-                    captured_count += 1
-                    
-                except Exception as retry_e:
-                    logger.warning(f"Failed to capture sticker {i} after retry: {retry_e}")
-                    continue
-            
-        except Exception as e:
-            logger.warning(f"Failed to capture sticker {i}: {e}")
-            continue
+                # Retry screenshot
+                data = element.screenshot(timeout=3000)
+                logger.debug(f"Captured element {i} on retry")
+                stickers.append(StickerImage(index=i, data=data, src=src))
+                events.emit("sticker_captured", index=i, bytes=len(data), src=src)
+                
+            except Exception as retry_e:
+                logger.warning(f"Failed to capture sticker {i} after retry: {retry_e}")
+                events.emit("error", index=i, message=str(retry_e), fatal=False)
+                return STATUS_FAILED
+        
+    except Exception as e:
+        logger.warning(f"Failed to capture sticker {i}: {e}")
+        events.emit("error", index=i, message=str(e), fatal=False)
+        return STATUS_FAILED
     
-    success_rate = (captured_count / total_elements * 100) if total_elements > 0 else 0
-    logger.info(f"✅ Capture complete: {captured_count}/{total_elements} images ({success_rate:.1f}% success rate)")
-    return captured_count
+    return STATUS_CAPTURED
 
 
-def save_metadata(output_dir: Path, url: str, sticker_count: int, product_id: str) -> None:
-    """Save metadata JSON file."""
+def write_sticker_image(sticker: StickerImage, output_dir: Path) -> None:
+    """Write one captured sticker to disk as a numbered PNG file."""
+    filepath = output_dir / sticker.filename
+    filepath.write_bytes(sticker.data)
+    sticker.path = filepath
+    logger.debug(f"Saved: {sticker.filename}")
+    events.emit("sticker_written", index=sticker.index, path=str(filepath.absolute()),
+                bytes=len(sticker.data))
+
+
+def write_sticker_images(stickers: List[StickerImage], output_dir: Path) -> int:
+    """Write captured stickers to disk as sequentially numbered PNG files."""
+    for sticker in stickers:
+        # Stickers already written by a DiskSink are left alone
+        if sticker.path is None:
+            write_sticker_image(sticker, output_dir)
+    return len(stickers)
+
+
+class DiskSink:
+    """
+    Per-sticker disk sink: writes each sticker file as soon as it is captured
+    and releases its bytes, so downstream consumers can start on a sticker
+    right away and memory stays bounded on large pages. Perceptual hashes are
+    computed later for the whole pack at once. Called from tab threads as
+    well, one sticker index per call.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+
+    def __call__(self, sticker: StickerImage) -> None:
+        write_sticker_image(sticker, self.output_dir)
+        sticker.data = None
+
+
+def capture_sticker_screenshots(elements: Union[StickerTable, list], output_dir: Path, page: Page) -> int:
+    """Capture screenshots of all sticker elements and write them to output_dir."""
+    stickers = capture_sticker_images(elements, page)
+    return write_sticker_images(stickers, output_dir)
+
+
+def _sticker_entry(sticker: StickerImage) -> dict:
+    """Metadata entry describing one captured sticker."""
+    entry = {"index": sticker.index, "file": sticker.filename, "src": sticker.src, "etag": sticker.etag}
+    if sticker.status is not None:
+        entry["status"] = sticker.status
+        entry["flags"] = sticker.flags
+    return entry
+
+
+def build_metadata(url: str, sticker_count: int, product_id: str,
+                   stickers: Optional[List[StickerImage]] = None) -> dict:
+    """Build the metadata dictionary describing a capture."""
     metadata = {
         "timestamp": datetime.now().isoformat(),
         "source_url": url,
@@ -725,11 +1135,699 @@ def save_metadata(output_dir: Path, url: str, sticker_count: int, product_id: st
         "tool_version": __version__
     }
     
+    if stickers is not None:
+        metadata["stickers"] = [_sticker_entry(s) for s in stickers]
+    
+    return metadata
+
+
+def save_metadata(output_dir: Path, url: str, sticker_count: int, product_id: str,
+                  metadata: Optional[dict] = None) -> None:
+    """Save metadata JSON file."""
+    if metadata is None:
+        metadata = build_metadata(url, sticker_count, product_id)
+    
     metadata_path = output_dir / "meta.json"
     with open(metadata_path, 'w', encoding='utf-8') as f:
         json.dump(metadata, f, indent=2, ensure_ascii=False)
     
     logger.info(f"Metadata saved: {metadata_path}")
+    _emit_file_written("metadata", metadata_path)
+
+
+def write_capture_result(result: CaptureResult, output_dir: Path, output_format: str = "files",
+                         extract_frames: bool = False) -> None:
+    """Disk sink: write the stickers, metadata and sticker index of a capture to output_dir."""
+    if output_format in ("files", "both"):
+        write_sticker_images(result.stickers, output_dir)
+    if output_format in ("atlas", "both"):
+        try:
+            import atlas
+        except ImportError:
+            raise CaptureError("Atlas output requires numpy and Pillow (pip install -r requirements.txt)")
+        atlas_index = atlas.write_atlas(result.stickers, output_dir, merge_existing=result.index is not None)
+        result.metadata["atlas"] = atlas.ATLAS_INDEX_FILENAME
+        for entry in atlas_index["atlases"]:
+            _emit_file_written("atlas", output_dir / entry["file"])
+        _emit_file_written("atlas", output_dir / atlas.ATLAS_INDEX_FILENAME)
+    
+    if result.animations:
+        import animated
+        extracted = animated.write_assets(result.animations, output_dir, frames=extract_frames)
+        # Only list frame directories that were actually written
+        for entry in result.metadata.get("animation", []):
+            if entry["index"] in extracted:
+                entry["frames_dir"] = animated.frames_path(entry["index"])
+            else:
+                entry.pop("frames_dir", None)
+    
+    save_metadata(output_dir, result.source_url, len(result.stickers),
+                  result.product_id, result.metadata)
+    
+    index = result.index
+    if index is None:
+        sticker_index = _import_sticker_index()
+        if sticker_index is not None:
+            index = sticker_index.StickerIndex(result.product_id)
+            index.update(result.stickers)
+    if index is not None:
+        index.save(output_dir)
+        _emit_file_written("index", output_dir / _import_sticker_index().INDEX_FILENAME)
+
+
+def _emit_file_written(kind: str, path: Path) -> None:
+    if events.enabled():
+        events.emit("file_written", kind=kind, path=str(path.absolute()), bytes=path.stat().st_size)
+
+
+def launch_browser(playwright, browser_name: str = "chromium", headless: bool = True) -> Browser:
+    """
+    Launch the requested Playwright browser engine. With "auto", engines are
+    tried from fastest to slowest according to the stored calibration.
+    """
+    if browser_name == "auto":
+        import calibrate
+        errors = []
+        for name in calibrate.ranked_browsers():
+            try:
+                browser = launch_browser(playwright, name, headless)
+            except Exception as e:
+                logger.warning(f"Could not launch {name}, trying the next engine: {e}")
+                errors.append(f"{name}: {e}")
+                continue
+            logger.info(f"🧭 Browser auto-selected: {name}")
+            return browser
+        raise CaptureError(f"No browser engine could be launched ({'; '.join(errors)})")
+    if browser_name == "firefox":
+        return playwright.firefox.launch(headless=headless)
+    elif browser_name == "webkit":
+        return playwright.webkit.launch(headless=headless)
+    return playwright.chromium.launch(headless=headless)
+
+
+def resolve_target_url(url: str, lang: Optional[str] = None) -> str:
+    """Validate a product page URL and apply the language override."""
+    if not url.startswith(PRODUCT_URL_PREFIX):
+        raise CaptureError("Invalid URL. Must be a LINE STORE product page.")
+    
+    target_url = url
+    if lang:
+        target_url = re.sub(r'/[a-z]{2}$', f'/{lang}', target_url)
+        logger.info(f"Language override: {lang}")
+    return target_url
+
+
+def _sticker_sources(table: StickerTable, etags: Dict[str, str]) -> Dict[int, Tuple[Optional[str], Optional[str]]]:
+    """Map each 1-based element position to its (src, etag)."""
+    return {i: (src, etags.get(src) if src else None) for i, src in enumerate(table.src, 1)}
+
+
+def _load_refresh_index(options: CaptureOptions):
+    """Load the sticker index of options.output_dir for a --refresh run."""
+    sticker_index = _import_sticker_index()
+    if sticker_index is None:
+        raise CaptureError("Refresh mode requires numpy and Pillow (pip install -r requirements.txt)")
+    if not options.output_dir:
+        raise CaptureError("Refresh mode requires an output directory")
+    
+    index = sticker_index.StickerIndex.load(Path(options.output_dir))
+    if index is None:
+        logger.info("🔁 No sticker index found - performing a full capture")
+    return index
+
+
+def _apply_refresh(index, stickers: List[StickerImage], positions: int,
+                   metrics: dict) -> List[StickerImage]:
+    """
+    Compare re-captured stickers against the index and keep only those whose
+    pixels changed. The index is updated in place for all re-captured positions.
+    """
+    sticker_index = _import_sticker_index()
+    hashes = [s.phash for s in stickers]
+    if not all(hashes):
+        hashes = sticker_index.compute_phashes([s.read() for s in stickers])
+    unchanged = index.unchanged_images(stickers, hashes)
+    index.update(stickers, hashes)
+    
+    # Drop positions that no longer exist on the page
+    index.entries = {k: v for k, v in index.entries.items() if k <= positions}
+    
+    changed = [s for s in stickers if s.index not in unchanged]
+    metrics["refresh"] = {
+        "recaptured": len(stickers),
+        "rewritten": len(changed),
+        "unchanged": len(unchanged),
+    }
+    logger.info(f"🔁 Refresh: {len(changed)} sticker(s) changed, {len(unchanged)} identical after re-capture")
+    return changed
+
+
+def _verify_and_recapture(page: Page, table: StickerTable, stickers: List[StickerImage],
+                          target_url: str, metrics: dict, popup_closed: bool = True,
+                          sink: Optional[Callable[[StickerImage], None]] = None) -> List[StickerImage]:
+    """
+    Verify a captured pack and re-capture only the flagged stickers.
+    While the popup is not known to be closed, every sticker is suspect.
+    Each sticker's status and flags are set from the last verification.
+    """
+    import verify
+    
+    try:
+        background = table.locator(page, stickers[0].index).evaluate(ELEMENT_BACKGROUND_JS)
+    except Exception as e:
+        logger.debug(f"Could not read the page background, assuming white: {e}")
+        background = [255, 255, 255]
+    
+    recaptured = 0
+    for attempt in range(VERIFY_MAX_RECAPTURES + 1):
+        flags = verify.verify_stickers(stickers, popup_closed, background)
+        flagged = {index for index, problems in flags.items() if problems}
+        if not flagged or attempt == VERIFY_MAX_RECAPTURES:
+            break
+        
+        logger.warning(f"🔍 {len(flagged)} sticker(s) flagged by verification, re-capturing...")
+        for index in sorted(flagged):
+            logger.debug(f"Sticker {index} flagged: {', '.join(flags[index])}")
+            events.emit("retry", index=index, reason=f"verification: {', '.join(flags[index])}")
+        
+        if any("overlay" in flags[index] or "popup" in flags[index] for index in flagged):
+            popup_closed = dismiss_popup(page, target_url)
+        page.wait_for_timeout(VERIFY_RECAPTURE_WAIT_MS)
+        
+        by_index = {s.index: s for s in stickers}
+        for sticker in capture_sticker_images(table, page, only=flagged, sink=sink):
+            sticker.etag = by_index[sticker.index].etag
+            by_index[sticker.index] = sticker
+            recaptured += 1
+        stickers = [by_index[i] for i in sorted(by_index)]
+    
+    still_flagged = sum(1 for s in stickers if s.flags)
+    metrics["verification"] = {"recaptured": recaptured, "flagged": still_flagged}
+    if still_flagged:
+        logger.warning(f"⚠️  {still_flagged} sticker(s) still flagged after re-capture (see meta.json)")
+    else:
+        logger.info("🔍 Verification passed for all stickers")
+    return stickers
+
+
+def _timed(metrics: dict, phase: str, started: float) -> None:
+    """Record the elapsed seconds of a pipeline phase in metrics."""
+    metrics["timings"][phase] = round(time.perf_counter() - started, 3)
+
+
+@contextmanager
+def _phase(metrics: dict, phase: str):
+    """Time a pipeline phase into metrics and report its start and end as events."""
+    events.emit("phase_start", phase=phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timed(metrics, phase, started)
+        events.emit("phase_end", phase=phase, seconds=metrics["timings"][phase])
+
+
+def capture_page(page: Page, target_url: str, product_id: str,
+                 options: CaptureOptions) -> CaptureResult:
+    """
+    Run the capture pipeline on an already opened page. With options.tabs > 1
+    the extra tabs open their own browsers with default context settings, so
+    page should come from a default context as well.
+    """
+    metrics: Dict[str, Any] = {"timings": {}}
+    
+    browser = page.context.browser
+    if options.browser == "auto" and browser is not None:
+        # Extra tabs use the engine auto-selected for this page
+        options = replace(options, browser=browser.browser_type.name)
+    metrics["browser"] = browser.browser_type.name if browser is not None else options.browser
+    
+    index = _load_refresh_index(options) if options.refresh else None
+    if options.verify:
+        try:
+            import verify  # noqa: F401
+        except ImportError:
+            raise CaptureError("Verification requires numpy and Pillow (pip install -r requirements.txt)")
+    
+    # Single files are written as stickers arrive; an atlas needs the whole pack, and
+    # refresh mode has to hash the pack before it knows which files to rewrite
+    sink = None
+    if options.output_dir is not None and options.output_format in ("files", "both") and index is None:
+        output_dir = Path(options.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        sink = DiskSink(output_dir)
+    
+    etags = _record_etags(page)
+    cache = _open_cache(page, options)
+    _install_rate_limit(page, cache)
+    try:
+        return _run_capture(page, target_url, product_id, options, metrics, index, etags, sink)
+    finally:
+        _close_cache(page, cache, metrics)
+        limiter = rate_limit.get_limiter()
+        if limiter is not None:
+            metrics["rate_limit"] = limiter.stats()
+
+
+def _record_etags(page: Page) -> Dict[str, str]:
+    """Remember the ETag of every response of page, keyed by URL, for the sticker index."""
+    etags: Dict[str, str] = {}
+    
+    def record_etag(response) -> None:
+        etag = response.headers.get("etag")
+        if etag:
+            etags[response.url] = etag
+    
+    page.on("response", record_etag)
+    return etags
+
+
+_CACHE_COUNTS = ("hits", "revalidated", "misses", "stored", "evicted")
+
+
+def _open_cache(page: Page, options: CaptureOptions) -> Optional[HttpCache]:
+    """Route the requests of page through the HTTP cache, if one is configured."""
+    if not options.cache_dir:
+        return None
+    cache = HttpCache(Path(options.cache_dir), options.cache_max_bytes)
+    cache.install(page)
+    return cache
+
+
+def _install_rate_limit(page: Page, cache: Optional[HttpCache]) -> None:
+    """
+    Pass the page's requests to hosts with a configured budget (RATE_LIMIT_HOST_RPS)
+    through the global rate limiter, if enabled. Other hosts are not throttled,
+    so third-party assets do not add waits to page loads.
+    With an HTTP cache the cache's route does this for requests that reach the network.
+    """
+    limiter = rate_limit.get_limiter()
+    if limiter is None or cache is not None:
+        return
+    
+    def limit(route) -> None:
+        if limiter.limits(route.request.url):
+            limiter.acquire(route.request.url)
+        route.fallback()
+    
+    def report(response) -> None:
+        if not limiter.limits(response.url):
+            return
+        # Time to first byte; -1 when the browser did not record it
+        elapsed = response.request.timing.get("responseStart", -1)
+        limiter.report(response.url, response.status, elapsed / 1000 if elapsed >= 0 else None,
+                       response.headers.get("retry-after"))
+    
+    page.route("**/*", limit)
+    page.on("response", report)
+
+
+def _close_cache(page: Page, cache: Optional[HttpCache], metrics: dict) -> None:
+    """Report cache statistics into metrics and detach the cache from page."""
+    if cache is None:
+        return
+    stats = cache.stats()
+    if "http_cache" in metrics:
+        # Several tabs share one cache directory; add up their counts
+        for key in _CACHE_COUNTS:
+            stats[key] += metrics["http_cache"][key]
+    metrics["http_cache"] = stats
+    logger.info(f"HTTP cache: {stats['hits']} hits, {stats['revalidated']} revalidated, "
+                f"{stats['misses']} misses")
+    try:
+        page.unroute("**/*")
+    except Exception as e:
+        logger.debug(f"Failed to remove cache route: {e}")
+    cache.close()
+
+
+def prepare_page(page: Page, target_url: str, options: CaptureOptions,
+                 metrics: dict, manual_popup: bool = True,
+                 cancelled: Optional[threading.Event] = None) -> Tuple[bool, bool]:
+    """
+    Load the product page, dismiss popups and make sure all sticker content is loaded.
+    Stops between steps with CaptureError once cancelled is set.
+    Returns (popup_closed, tall_viewport).
+    """
+    def check_cancelled() -> None:
+        if cancelled is not None and cancelled.is_set():
+            raise CaptureError("Capture cancelled")
+    
+    with _phase(metrics, "goto"):
+        logger.info("Loading page...")
+        page.goto(target_url, wait_until="networkidle")
+    
+    # Handle popup dismissal based on mode
+    check_cancelled()
+    with _phase(metrics, "popup"):
+        if options.manual_popup and manual_popup:
+            popup_closed = wait_for_manual_popup_dismissal(page, options.manual_wait, target_url)
+        else:
+            popup_closed = dismiss_popup(page, target_url)
+    
+    if not popup_closed:
+        logger.warning("⚠️  Popup could not be closed - proceeding anyway")
+        logger.warning("⚠️  Captured images may include popup overlay")
+    
+    # Wait for page to stabilize after popup dismissal
+    check_cancelled()
+    with _phase(metrics, "load"):
+        wait_for_page_load(page, options.delay)
+        
+        # Additional wait for content to load after popup is dismissed
+        logger.debug("Waiting for content to load after popup dismissal...")
+        page.wait_for_timeout(2000)
+        
+        # Ensure all content is loaded, either in one tall viewport or by scrolling through the page
+        tall = options.tall_viewport and expand_viewport_to_content(page)
+        check_cancelled()
+        if not tall:
+            ensure_all_content_loaded(page)
+        metrics["tall_viewport"] = tall
+    return popup_closed, tall
+
+
+def split_positions(positions: List[int], parts: int) -> List[List[int]]:
+    """Split sorted positions into at most parts contiguous, non-empty ranges."""
+    parts = max(1, min(parts, len(positions)))
+    size, extra = divmod(len(positions), parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(positions[start:end])
+        start = end
+    return ranges
+
+
+class _TabPool:
+    """
+    Extra tabs of one capture. Each tab runs in its own thread with its own
+    Playwright instance and browser, and launches and prepares the page right
+    away, in parallel with the primary tab. It then waits for the positions to
+    capture. Tabs do not share storage state with the primary page.
+    """
+    
+    def __init__(self, target_url: str, product_id: str, options: CaptureOptions,
+                 sink: Optional[Callable[[StickerImage], None]] = None):
+        self.count = options.tabs - 1
+        self._assignments = [queue.Queue(maxsize=1) for _ in range(self.count)]
+        self._assigned = False
+        self._cancelled = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.count)
+        self.futures = [
+            self._executor.submit(_capture_tab, target_url, product_id, options, assignment,
+                                  self._cancelled, tab, sink)
+            for tab, assignment in enumerate(self._assignments, 2)
+        ]
+    
+    def assign(self, ranges: List[List[int]], expected_count: int) -> None:
+        """Hand one range to each tab. Tabs without a range are released."""
+        for i, assignment in enumerate(self._assignments):
+            assignment.put((ranges[i], expected_count) if i < len(ranges) else None)
+        self._assigned = True
+    
+    def close(self) -> None:
+        """
+        Cancel tabs that never got a range and wait until every tab has closed
+        its browser, so no tab outlives the capture.
+        """
+        if not self._assigned:
+            self._cancelled.set()
+            self.assign([], 0)
+        self._executor.shutdown(wait=True)
+
+
+def _capture_tab(target_url: str, product_id: str, options: CaptureOptions, assignment: "queue.Queue",
+                 cancelled: threading.Event, tab: int,
+                 sink: Optional[Callable[[StickerImage], None]] = None) -> Tuple[List[StickerImage], dict]:
+    """
+    Prepare the page in an extra tab, then capture the range of positions
+    received from assignment (None releases the tab without capturing).
+    Preparation stops early once cancelled is set.
+    """
+    metrics: Dict[str, Any] = {"timings": {}}
+    started = time.perf_counter()
+    with events.bound(product_id=product_id, tab=tab), sync_playwright() as p:
+        if cancelled.is_set():
+            return [], metrics
+        browser = launch_browser(p, options.browser, options.headless)
+        try:
+            page = browser.new_page()
+            etags = _record_etags(page)
+            cache = _open_cache(page, options)
+            _install_rate_limit(page, cache)
+            try:
+                _, tall = prepare_page(page, target_url, options, metrics, manual_popup=False,
+                                       cancelled=cancelled)
+                table = find_sticker_table(page)
+                metrics["timings"]["ready"] = round(time.perf_counter() - started, 3)
+                
+                waited = time.perf_counter()
+                job = assignment.get()
+                metrics["timings"]["wait"] = round(time.perf_counter() - waited, 3)
+                if job is None:
+                    return [], metrics
+                
+                positions, expected_count = job
+                metrics["positions"] = [positions[0], positions[-1]]
+                if len(table) != expected_count:
+                    raise CaptureError(f"Tab {tab} found {len(table)} elements, expected {expected_count}")
+                
+                logger.info(f"🗂️  Tab {tab}: capturing positions {positions[0]}-{positions[-1]}")
+                with _phase(metrics, "capture"):
+                    stickers = capture_sticker_images(table, page, only=set(positions), scroll=not tall, sink=sink)
+                metrics["status"] = {i: table.status[i - 1] for i in positions}
+                for sticker in stickers:
+                    sticker.etag = etags.get(sticker.src) if sticker.src else None
+                return stickers, metrics
+            finally:
+                _close_cache(page, cache, metrics)
+        finally:
+            browser.close()
+
+
+def _capture_in_tabs(page: Page, table: StickerTable, positions: List[int], tabs: _TabPool,
+                     tall: bool, etags: Dict[str, str], metrics: dict,
+                     sink: Optional[Callable[[StickerImage], None]] = None) -> List[StickerImage]:
+    """
+    Capture positions split across the primary page and the extra tabs. The
+    primary page takes the first range while the tabs capture the others in
+    parallel. Ranges whose tab fails are captured afterwards on the primary page.
+    """
+    ranges = split_positions(positions, tabs.count + 1)
+    logger.info(f"🗂️  Splitting {len(positions)} stickers across {len(ranges)} tabs")
+    tabs.assign(ranges[1:], len(table))
+    
+    started = time.perf_counter()
+    stickers = capture_sticker_images(table, page, only=set(ranges[0]), scroll=not tall, sink=sink)
+    for sticker in stickers:
+        sticker.etag = etags.get(sticker.src) if sticker.src else None
+    primary = {"tab": 1, "positions": [ranges[0][0], ranges[0][-1]],
+               "timings": {"capture": round(time.perf_counter() - started, 3)}}
+    
+    tab_timings = [primary]
+    for tab, (future, fallback) in enumerate(zip(tabs.futures, ranges[1:]), 2):
+        try:
+            tab_stickers, extra_metrics = future.result()
+            stickers.extend(tab_stickers)
+            for i, status in extra_metrics["status"].items():
+                table.status[i - 1] = status
+            tab_timings.append({"tab": tab, "positions": extra_metrics["positions"],
+                                "timings": extra_metrics["timings"]})
+            if "http_cache" in extra_metrics:
+                totals = metrics.setdefault("http_cache", dict.fromkeys(_CACHE_COUNTS, 0))
+                for key in _CACHE_COUNTS:
+                    totals[key] += extra_metrics["http_cache"][key]
+        except Exception as e:
+            logger.warning(f"Tab {tab} capture failed ({e}); capturing positions "
+                           f"{fallback[0]}-{fallback[-1]} on the primary tab")
+            for i in fallback:
+                events.emit("retry", index=i, reason=f"tab {tab} failed: {e}")
+            tab_timings.append({"tab": tab, "positions": [fallback[0], fallback[-1]], "error": str(e)})
+            retried = capture_sticker_images(table, page, only=set(fallback), scroll=not tall, sink=sink)
+            for sticker in retried:
+                sticker.etag = etags.get(sticker.src) if sticker.src else None
+            stickers.extend(retried)
+    
+    metrics["tabs"] = {"count": len(ranges), "tabs": tab_timings}
+    return sorted(stickers, key=lambda s: s.index)
+
+
+def _start_animation_download(page: Page, options: CaptureOptions):
+    """
+    Detect native animation/sound assets on the page and start downloading them
+    in the background. Returns a future of the assets, or None for static packs.
+    """
+    import animated
+    
+    assets = animated.collect_previews(page)
+    if not animated.is_animated_pack(assets):
+        logger.info("Static sticker pack - no native animation assets")
+        return None
+    
+    logger.info(f"🎞️  Animated pack detected - downloading native assets for {len(assets)} stickers")
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(animated.download_assets, assets, options.cache_dir)
+    executor.shutdown(wait=False)
+    return future
+
+
+def _run_capture(page: Page, target_url: str, product_id: str, options: CaptureOptions,
+                 metrics: dict, index, etags: Dict[str, str],
+                 sink: Optional[Callable[[StickerImage], None]] = None) -> CaptureResult:
+    """Load the page, find sticker elements and capture them."""
+    # Extra tabs launch and load the page while the primary tab does the same
+    tabs = _TabPool(target_url, product_id, options, sink) if options.tabs > 1 else None
+    try:
+        popup_closed, tall = prepare_page(page, target_url, options, metrics)
+        
+        with _phase(metrics, "find"):
+            logger.info("Searching for sticker elements...")
+            table = find_sticker_table(page)
+        
+        if not table:
+            raise CaptureError("No sticker elements found on the page")
+        
+        logger.info(f"Found {len(table)} sticker elements")
+        if events.enabled():
+            for i, src in enumerate(table.src, 1):
+                events.emit("element_found", index=i, total=len(table), src=src, bbox=table.bounding_box(i))
+        
+        only = None
+        if index is not None:
+            only = index.changed_positions(_sticker_sources(table, etags))
+            logger.info(f"🔁 Refresh: {len(only)}/{len(table)} positions changed since last capture")
+        
+        # Native animation assets are plain HTTP downloads and run while screenshots are taken
+        animation_download = None
+        if options.animated != "off":
+            animation_download = _start_animation_download(page, options)
+        
+        positions = sorted(only) if only is not None else list(range(1, len(table) + 1))
+        with _phase(metrics, "capture"):
+            if animation_download is not None and options.animated == "only":
+                logger.info("🎞️  Animated pack - skipping static screenshots")
+                stickers = []
+            elif tabs is not None and len(positions) > 1:
+                stickers = _capture_in_tabs(page, table, positions, tabs, tall, etags, metrics, sink)
+            else:
+                stickers = capture_sticker_images(table, page, only=only, scroll=not tall, sink=sink)
+                for sticker in stickers:
+                    sticker.etag = etags.get(sticker.src) if sticker.src else None
+        
+        if options.verify and stickers:
+            with _phase(metrics, "verify"):
+                stickers = _verify_and_recapture(page, table, stickers, target_url, metrics, popup_closed, sink)
+        
+        animations = []
+        if animation_download is not None:
+            with _phase(metrics, "animation_wait"):
+                animations = animation_download.result()
+        
+        requested = len(table) if only is None else len(only)
+        if animation_download is not None and options.animated == "only":
+            requested = 0
+        metrics["elements_found"] = len(table)
+        metrics["element_status"] = table.counts()
+        metrics["captured"] = len(stickers)
+        metrics["failed"] = requested - len(stickers)
+        
+        if index is not None:
+            recaptured = {s.index: s for s in stickers}
+            stickers = _apply_refresh(index, stickers, len(table), metrics)
+            metadata = build_metadata(target_url, len(index.entries), product_id)
+            metadata["stickers"] = []
+            for k, e in sorted(index.entries.items()):
+                entry = {"index": k, "file": e["file"], "src": e.get("src"), "etag": e.get("etag")}
+                if k in recaptured and recaptured[k].status is not None:
+                    entry["status"] = recaptured[k].status
+                    entry["flags"] = recaptured[k].flags
+                metadata["stickers"].append(entry)
+        else:
+            metadata = build_metadata(target_url, len(stickers), product_id, stickers)
+        
+        if animations:
+            import animated
+            metadata["animation"] = animated.metadata_entries(animations, options.extract_frames)
+        
+        return CaptureResult(
+            product_id=product_id,
+            source_url=target_url,
+            stickers=stickers,
+            metadata=metadata,
+            metrics=metrics,
+            popup_closed=popup_closed,
+            index=index,
+            animations=[a for a in animations if a.animation or a.sound],
+        )
+    finally:
+        if tabs is not None:
+            tabs.close()
+
+
+def capture_product(url: str, options: Optional[CaptureOptions] = None,
+                    browser: Optional[Browser] = None,
+                    context: Optional[BrowserContext] = None) -> CaptureResult:
+    """
+    Capture all stickers of a LINE STORE product and return them in memory.
+
+    An existing browser or context can be passed in for reuse across calls;
+    otherwise a browser is launched for this capture only. Nothing is written
+    to disk unless options.output_dir is set.
+    Raises CaptureError when the URL is invalid or nothing could be captured.
+    """
+    options = options or CaptureOptions()
+    if options.tabs > 1 and (browser is not None or context is not None):
+        # Extra tabs launch their own browsers and could not match a caller's context settings
+        raise CaptureError("tabs > 1 requires capture_product to launch its own browser")
+    
+    target_url = resolve_target_url(url, options.lang)
+    product_id = extract_product_id(url)
+    if not product_id:
+        raise CaptureError("Could not extract product ID from URL")
+    
+    logger.info(f"Product ID: {product_id}")
+    logger.info(f"Target URL: {target_url}")
+    
+    with events.bound(product_id=product_id):
+        events.emit("capture_start", url=target_url)
+        started = time.perf_counter()
+        if context is not None:
+            page = context.new_page()
+            try:
+                result = capture_page(page, target_url, product_id, options)
+            finally:
+                page.close()
+        elif browser is not None:
+            own_context = browser.new_context()
+            try:
+                result = capture_page(own_context.new_page(), target_url, product_id, options)
+            finally:
+                own_context.close()
+        else:
+            with sync_playwright() as p:
+                launch_metrics: Dict[str, Any] = {"timings": {}}
+                with _phase(launch_metrics, "launch"):
+                    own_browser = launch_browser(p, options.browser, options.headless)
+                try:
+                    result = capture_page(own_browser.new_page(), target_url, product_id, options)
+                    result.metrics["timings"].update(launch_metrics["timings"])
+                finally:
+                    own_browser.close()
+        result.metrics["total_seconds"] = round(time.perf_counter() - started, 3)
+        
+        if not result.stickers and not result.animations and "refresh" not in result.metrics:
+            raise CaptureError("No stickers were successfully captured")
+        
+        if options.output_dir is not None:
+            output_dir = setup_output_directory(str(options.output_dir), product_id)
+            write_capture_result(result, output_dir, options.output_format, options.extract_frames)
+        
+        events.emit("capture_end", captured=len(result.stickers), failed=result.metrics.get("failed", 0),
+                    seconds=result.metrics["total_seconds"],
+                    output_dir=str(Path(options.output_dir).absolute()) if options.output_dir else None)
+    return result
 
 
 def main():
@@ -791,9 +1889,9 @@ copyright law and LINE's Terms of Service.
     
     parser.add_argument(
         "--browser",
-        choices=["chromium", "firefox", "webkit"],
+        choices=["chromium", "firefox", "webkit", "auto"],
         default="chromium",
-        help="Browser to use (default: chromium)"
+        help="Browser to use; auto picks the fastest calibrated engine (default: chromium)"
     )
     
     parser.add_argument(
@@ -815,12 +1913,85 @@ copyright law and LINE's Terms of Service.
         help="Seconds to wait for manual popup dismissal (default: 30)"
     )
     
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory of the on-disk HTTP cache (default: no cache)"
+    )
+    
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=HTTP_CACHE_MAX_BYTES // (1024 * 1024),
+        help=f"Maximum HTTP cache size in MB (default: {HTTP_CACHE_MAX_BYTES // (1024 * 1024)})"
+    )
+    
+    parser.add_argument(
+        "--tall-viewport",
+        action="store_true",
+        help="Resize the viewport to fit the whole sticker grid instead of scrolling"
+    )
+    
+    parser.add_argument(
+        "--tabs",
+        type=int,
+        default=1,
+        help="Split the capture of one product across this many parallel tabs (default: 1)"
+    )
+    
+    parser.add_argument(
+        "--output-format",
+        choices=["files", "atlas", "both"],
+        default="files",
+        help="Write single PNG files, one atlas image with atlas.json, or both (default: files)"
+    )
+    
+    parser.add_argument(
+        "--animated",
+        choices=["off", "add", "only"],
+        default="off",
+        help="Download native APNG/sound assets of animated packs in addition to (add) "
+             "or instead of (only) screenshots (default: off)"
+    )
+    
+    parser.add_argument(
+        "--extract-frames",
+        action="store_true",
+        help="With --animated, also write every animation frame as a PNG"
+    )
+    
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Verify captures and re-capture blank, clipped or overlay-contaminated stickers"
+    )
+    
+    parser.add_argument(
+        "--rate-limit",
+        action="store_true",
+        help="Throttle requests with per-host budgets shared by all running captures on this machine"
+    )
+    
+    parser.add_argument(
+        "--events",
+        choices=["jsonl"],
+        help="Write progress events as JSON lines to stdout (logs stay on stderr)"
+    )
+    
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-capture and rewrite only stickers changed since the last capture (uses index.json)"
+    )
+    
     args = parser.parse_args()
     
     # Setup logging
-    if args.verbose:
-        logging.getLogger().setLevel(logging.DEBUG)
-        logger.debug("Debug logging enabled")
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    logger.debug("Debug logging enabled")
     
     # Validate manual popup mode
     if args.manual_popup and args.headless:
@@ -828,8 +1999,9 @@ copyright law and LINE's Terms of Service.
         sys.exit(1)
     
     # Validate URL
-    if not args.url.startswith("https://store.line.me/stickershop/product/"):
+    if not args.url.startswith(PRODUCT_URL_PREFIX):
         logger.error("Invalid URL. Must be a LINE STORE product page.")
+        logger.error("Use crawler.py for author, series or search listing pages.")
         sys.exit(1)
     
     # Extract product ID
@@ -838,84 +2010,57 @@ copyright law and LINE's Terms of Service.
         logger.error("Could not extract product ID from URL")
         sys.exit(1)
     
-    logger.info(f"Product ID: {product_id}")
-    
-    # Setup output directory
-    output_dir = setup_output_directory(args.outdir, product_id)
-    
-    # Modify URL for language if specified
-    target_url = args.url
-    if args.lang:
-        target_url = re.sub(r'/[a-z]{2}$', f'/{args.lang}', target_url)
-        logger.info(f"Language override: {args.lang}")
+    options = CaptureOptions(
+        lang=args.lang,
+        delay=args.delay,
+        headless=args.headless,
+        browser=args.browser,
+        manual_popup=args.manual_popup,
+        manual_wait=args.manual_wait,
+        refresh=args.refresh,
+        verify=args.verify,
+        tall_viewport=args.tall_viewport,
+        tabs=max(1, args.tabs),
+        output_format=args.output_format,
+        animated=args.animated,
+        extract_frames=args.extract_frames,
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        output_dir=args.outdir or str(Path("output") / product_id),
+    )
     
-    logger.info(f"Target URL: {target_url}")
+    if args.rate_limit:
+        rate_limit.configure()
+    if args.events:
+        events.configure(sys.stdout)
     
     # Launch browser and capture stickers
     try:
-        with sync_playwright() as p:
-            if args.browser == "firefox":
-                browser: Browser = p.firefox.launch(headless=args.headless)
-            elif args.browser == "webkit":
-                browser: Browser = p.webkit.launch(headless=args.headless)
-            else:
-                browser: Browser = p.chromium.launch(headless=args.headless)
-            page: Page = browser.new_page()
-            
-            logger.info("Loading page...")
-            page.goto(target_url, wait_until="networkidle")
-            
-            # Handle popup dismissal based on mode
-            if args.manual_popup:
-                popup_closed = wait_for_manual_popup_dismissal(page, args.manual_wait, target_url)
-            else:
-                popup_closed = dismiss_popup(page, target_url)
-            
-            if not popup_closed:
-                logger.warning("⚠️  Popup could not be closed - proceeding anyway")
-                logger.warning("⚠️  Captured images may include popup overlay")
-            
-            # Wait for page to stabilize after popup dismissal
-            wait_for_page_load(page, args.delay)
-            
-            # Additional wait for content to load after popup is dismissed
-            logger.debug("Waiting for content to load after popup dismissal...")
-            page.wait_for_timeout(2000)
-            
-            # Ensure all content is loaded by scrolling through the page
-            ensure_all_content_loaded(page)
-            
-            logger.info("Searching for sticker elements...")
-            sticker_elements = find_sticker_elements(page)
-            
-            if not sticker_elements:
-                logger.error("No sticker elements found on the page")
-                browser.close()
-                sys.exit(1)
-            
-            logger.info(f"Found {len(sticker_elements)} sticker elements")
-            
-            # Capture screenshots
-            captured_count = capture_sticker_screenshots(sticker_elements, output_dir, page)
-            
-            # Save metadata
-            save_metadata(output_dir, target_url, captured_count, product_id)
-            
-            browser.close()
-            
-            if captured_count == 0:
-                logger.error("No stickers were successfully captured")
-                sys.exit(1)
-            
-            logger.info(f"✅ Complete! Captured {captured_count} stickers to {output_dir}")
+        result = capture_product(args.url, options)
+        if options.refresh and "refresh" in result.metrics:
+            logger.info(f"✅ Complete! Rewrote {len(result.stickers)} changed stickers in "
+                        f"{Path(options.output_dir).absolute()}")
+        else:
+            logger.info(f"✅ Complete! Captured {len(result.stickers)} stickers to "
+                        f"{Path(options.output_dir).absolute()}")
+        if "rate_limit" in result.metrics:
+            stats = result.metrics["rate_limit"]
+            logger.info(f"Rate limit: {stats['requests']} requests, waited {stats['wait_seconds']:.1f}s "
+                        f"in total ({stats['backoffs']} backoffs)")
             
+    except CaptureError as e:
+        logger.error(str(e))
+        events.emit("error", product_id=product_id, message=str(e), fatal=True)
+        sys.exit(1)
     except KeyboardInterrupt:
         logger.info("Operation cancelled by user")
+        events.emit("error", product_id=product_id, message="cancelled", fatal=True)
         sys.exit(1)
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
+        events.emit("error", product_id=product_id, message=str(e), fatal=True)
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
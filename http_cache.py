@@ -0,0 +1,311 @@
+"""
+On-disk HTTP cache for LINE STORE Sticker Capture Tool.
+
+Response bodies are stored as files and their validators (ETag,
+Last-Modified) in a small SQLite index. The cache serves both the capture
+browser, through Playwright request routing, and direct HTTP fetches.
+Immutable sticker assets are served without any request; everything else
+is revalidated with a conditional request. The total size is bounded by
+evicting the least recently used entries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import rate_limit
+from config import (
+    HTTP_CACHE_IMMUTABLE_HOSTS,
+    HTTP_CACHE_MAX_BYTES,
+    HTTP_TIMEOUT_SECONDS,
+    HTTP_USER_AGENT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Headers that describe the transfer rather than the stored body
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+# Headers meant for one client only; replaying them from the cache would reset cookies or auth state
+_PRIVATE_HEADERS = {"set-cookie", "set-cookie2", "authentication-info", "proxy-authentication-info"}
+
+# Request headers the cache key may ignore in Vary (bodies are stored decoded)
+_IGNORED_VARY = {"accept-encoding"}
+
+
+def http_get(url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    GET a URL, returning (status, headers, body). A 304 is returned, not raised.
+    HTTP(S) requests go through the global rate limiter when it is enabled.
+    """
+    limiter = rate_limit.get_limiter() if url.startswith(("http://", "https://")) else None
+    if limiter is not None:
+        limiter.acquire(url)
+    request = urllib.request.Request(url, headers={"User-Agent": HTTP_USER_AGENT, **(headers or {})})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT_SECONDS) as response:
+            body = response.read()
+            if limiter is not None:
+                limiter.report(url, response.status, time.perf_counter() - started)
+            # Non-HTTP URLs (e.g. file:// fixtures) have no status code
+            return response.status or 200, dict(response.headers), body
+    except urllib.error.HTTPError as e:
+        if limiter is not None:
+            limiter.report(url, e.code, time.perf_counter() - started, e.headers.get("Retry-After"))
+        if e.code == 304:
+            return 304, dict(e.headers), b""
+        raise
+
+
+@dataclass
+class CachedResponse:
+    """A response served through the cache."""
+    url: str
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    cache_status: str = "miss"  # "hit", "revalidated" or "miss"
+
+
+class HttpCache:
+    """LRU-bounded on-disk HTTP cache with conditional revalidation."""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.body_dir = self.cache_dir / "bodies"
+        self.body_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.counts = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.cache_dir / "index.sqlite"), check_same_thread=False, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " url TEXT PRIMARY KEY, key TEXT, status INTEGER, headers TEXT,"
+            " etag TEXT, last_modified TEXT, size INTEGER, last_access REAL)"
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counts[name] += amount
+
+    @staticmethod
+    def is_immutable(url: str) -> bool:
+        """Sticker shop assets are versioned by URL and never change in place."""
+        parsed = urlparse(url)
+        return parsed.hostname in HTTP_CACHE_IMMUTABLE_HOSTS and parsed.path.startswith("/stickershop/")
+
+    def _body_path(self, key: str) -> Path:
+        return self.body_dir / key[:2] / key
+
+    def lookup(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for url without touching the network."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT key, status, headers FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        key, status, headers = row
+        try:
+            body = self._body_path(key).read_bytes()
+        except OSError:
+            self._delete(url, key)
+            return None
+        headers = {k: v for k, v in json.loads(headers).items() if k.lower() not in _PRIVATE_HEADERS}
+        return CachedResponse(url, status, headers, body, "hit")
+
+    def _touch(self, url: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+    def _delete(self, url: str, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._db.commit()
+        try:
+            self._body_path(key).unlink()
+        except OSError:
+            pass
+
+    @staticmethod
+    def is_storable(status: int, headers: Dict[str, str], url: str) -> bool:
+        """
+        Only successful responses that can be revalidated (or are immutable) are
+        kept. Responses that vary on request headers other than Accept-Encoding
+        are not, since the cache is keyed by URL alone.
+        """
+        lowered = {k.lower(): v for k, v in headers.items()}
+        cache_control = lowered.get("cache-control", "").lower()
+        if status != 200 or "no-store" in cache_control or "private" in cache_control:
+            return False
+        vary = {v.strip().lower() for v in lowered.get("vary", "").split(",") if v.strip()}
+        if vary - _IGNORED_VARY:
+            return False
+        return "etag" in lowered or "last-modified" in lowered or HttpCache.is_immutable(url)
+
+    def store(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        """Store a response body and its validators, then enforce the size limit."""
+        headers = {k: v for k, v in headers.items()
+                   if k.lower() not in _DROPPED_HEADERS and k.lower() not in _PRIVATE_HEADERS}
+        lowered = {k.lower(): v for k, v in headers.items()}
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        path = self._body_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partial body
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, key, status, json.dumps(headers), lowered.get("etag"),
+                 lowered.get("last-modified"), len(body), time.time()),
+            )
+            self._db.commit()
+        self._count("stored")
+        self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for url, key, size in self._db.execute(
+                "SELECT url, key, size FROM entries ORDER BY last_access ASC"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                victims.append((url, key))
+                total -= size
+            self._db.executemany("DELETE FROM entries WHERE url = ?", [(url,) for url, _ in victims])
+            self._db.commit()
+        for _, key in victims:
+            try:
+                self._body_path(key).unlink()
+            except OSError:
+                pass
+        self._count("evicted", len(victims))
+        logger.debug(f"HTTP cache evicted {len(victims)} entries")
+
+    @staticmethod
+    def conditional_headers(cached: CachedResponse) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for revalidating cached."""
+        lowered = {k.lower(): v for k, v in cached.headers.items()}
+        headers = {}
+        if lowered.get("etag"):
+            headers["If-None-Match"] = lowered["etag"]
+        if lowered.get("last-modified"):
+            headers["If-Modified-Since"] = lowered["last-modified"]
+        return headers
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """Direct GET through the cache."""
+        cached = self.lookup(url)
+        if cached is not None and self.is_immutable(url):
+            self._count("hits")
+            self._touch(url)
+            return cached
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            request_headers.update(self.conditional_headers(cached))
+
+        status, response_headers, body = http_get(url, request_headers)
+        if status == 304 and cached is not None:
+            self._count("revalidated")
+            self._touch(url)
+            cached.cache_status = "revalidated"
+            return cached
+
+        self._count("misses")
+        if self.is_storable(status, response_headers, url):
+            self.store(url, status, response_headers, body)
+        return CachedResponse(url, status, response_headers, body, "miss")
+
+    def install(self, target) -> None:
+        """Serve all GET requests of a Playwright page or context through the cache."""
+        target.route("**/*", self._handle_route)
+
+    def _handle_route(self, route) -> None:
+        request = route.request
+        url = request.url
+        if request.method != "GET" or not url.startswith(("http://", "https://")):
+            route.continue_()
+            return
+
+        cached = self.lookup(url)
+        if cached is not None and self.is_immutable(url):
+            self._count("hits")
+            self._touch(url)
+            route.fulfill(status=cached.status, headers=cached.headers, body=cached.body)
+            return
+
+        headers = dict(request.headers)
+        if cached is not None:
+            headers.update(self.conditional_headers(cached))
+
+        # Only hosts with their own budget are throttled inside the browser
+        limiter = rate_limit.get_limiter()
+        if limiter is not None and not limiter.limits(url):
+            limiter = None
+        if limiter is not None:
+            limiter.acquire(url)
+        started = time.perf_counter()
+        try:
+            response = route.fetch(headers=headers)
+            if limiter is not None:
+                limiter.report(url, response.status, time.perf_counter() - started,
+                               response.headers.get("retry-after"))
+        except Exception as e:
+            logger.debug(f"HTTP cache fetch failed for {url}: {e}")
+            if cached is not None:
+                # Serve stale content rather than failing the page
+                route.fulfill(status=cached.status, headers=cached.headers, body=cached.body)
+            else:
+                route.abort()
+            return
+
+        if response.status == 304 and cached is not None:
+            self._count("revalidated")
+            self._touch(url)
+            route.fulfill(status=cached.status, headers=cached.headers, body=cached.body)
+            return
+
+        self._count("misses")
+        body = response.body()
+        response_headers = response.headers
+        if self.is_storable(response.status, response_headers, url):
+            self.store(url, response.status, response_headers, body)
+        route.fulfill(
+            status=response.status,
+            headers={k: v for k, v in response_headers.items() if k.lower() not in _DROPPED_HEADERS},
+            body=body,
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/revalidation counts plus the current cache size."""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {**self.counts, "entries": entries, "bytes": size}
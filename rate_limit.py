@@ -0,0 +1,196 @@
+"""
+Global rate limiter for LINE STORE Sticker Capture Tool.
+
+A token bucket per host, shared by every thread of a process and, through a
+small state file guarded by a lock file, by every process on the machine.
+Requests reserve a token and sleep until it becomes available, so waiters
+are served in order without busy polling. The rate of a host is lowered
+multiplicatively on 429/5xx or slow responses (honouring Retry-After) and
+recovers additively on successful ones, and all processes see the change.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from config import (
+    RATE_LIMIT_BACKOFF_FACTOR,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_DEFAULT_RPS,
+    RATE_LIMIT_HOST_RPS,
+    RATE_LIMIT_MIN_RPS,
+    RATE_LIMIT_RECOVERY_STEP,
+    RATE_LIMIT_SLOW_SECONDS,
+    RATE_LIMIT_STATE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = Path(tempfile.gettempdir()) / "line-stamp-capture-ratelimit.json"
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """Exclusive inter-process lock on path."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).hostname or url
+
+
+class RateLimiter:
+    """Per-host token buckets with adaptive backoff, shared across threads and processes."""
+
+    def __init__(self, host_rates: Optional[Dict[str, float]] = None,
+                 default_rate: float = RATE_LIMIT_DEFAULT_RPS, burst: float = RATE_LIMIT_BURST,
+                 state_path: Optional[Path] = DEFAULT_STATE_PATH):
+        self.host_rates = {**RATE_LIMIT_HOST_RPS, **(host_rates or {})}
+        self.default_rate = default_rate
+        self.burst = burst
+        self.state_path = Path(state_path) if state_path else None
+        self._lock = threading.Lock()
+        self._state: Dict[str, dict] = {}
+        self.counts = {"requests": 0, "waited": 0, "backoffs": 0}
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+
+    def base_rate(self, host: str) -> float:
+        return self.host_rates.get(host, self.default_rate)
+
+    def limits(self, url: str) -> bool:
+        """True if the host of url has its own configured budget."""
+        return host_of(url) in self.host_rates
+
+    @contextmanager
+    def _shared_state(self):
+        """Load, yield and store the bucket state under both locks."""
+        with self._lock:
+            if self.state_path is None:
+                yield self._state
+                return
+            with _file_lock(self.state_path.with_suffix(".lock")):
+                try:
+                    state = json.loads(self.state_path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    state = {}
+                # Forget hosts nobody has used for a while, so old backoff does not linger
+                now = time.time()
+                for host in [h for h, b in state.items()
+                             if now - b.get("updated", 0) > RATE_LIMIT_STATE_TTL_SECONDS
+                             and b.get("blocked_until", 0) < now]:
+                    del state[host]
+                yield state
+                tmp_path = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps(state), encoding="utf-8")
+                os.replace(tmp_path, self.state_path)
+
+    def _bucket(self, state: Dict[str, dict], host: str, now: float) -> dict:
+        bucket = state.get(host)
+        if bucket is None:
+            bucket = state[host] = {"tokens": self.burst, "updated": now,
+                                    "rate": self.base_rate(host), "blocked_until": 0.0}
+        # Another process may have stored a higher budget; this limiter's budget always applies
+        bucket["rate"] = min(bucket["rate"], self.base_rate(host))
+        return bucket
+
+    def acquire(self, url: str) -> float:
+        """Wait for a request slot for the host of url. Returns the seconds waited."""
+        host = host_of(url)
+        with self._shared_state() as state:
+            now = time.time()
+            bucket = self._bucket(state, host, now)
+            elapsed = max(0.0, now - bucket["updated"])
+            bucket["tokens"] = min(self.burst, bucket["tokens"] + elapsed * bucket["rate"]) - 1
+            bucket["updated"] = now
+            # A negative balance is a reservation: wait until it is paid back
+            wait = max(0.0, -bucket["tokens"] / bucket["rate"], bucket["blocked_until"] - now)
+
+        with self._lock:
+            self.counts["requests"] += 1
+            if wait > 0:
+                self.counts["waited"] += 1
+                self.wait_seconds += wait
+                self.max_wait = max(self.max_wait, wait)
+        if wait > 0:
+            logger.debug(f"Rate limit: waiting {wait:.2f}s for {host}")
+            time.sleep(wait)
+        return wait
+
+    def report(self, url: str, status: Optional[int], elapsed: Optional[float] = None,
+               retry_after: Optional[str] = None) -> None:
+        """Adapt the host's rate to the outcome of a request."""
+        host = host_of(url)
+        throttled = status == 429 or (status is not None and status >= 500)
+        slow = elapsed is not None and elapsed > RATE_LIMIT_SLOW_SECONDS
+        with self._shared_state() as state:
+            now = time.time()
+            bucket = self._bucket(state, host, now)
+            base = self.base_rate(host)
+            if throttled or slow:
+                bucket["rate"] = max(RATE_LIMIT_MIN_RPS, bucket["rate"] * RATE_LIMIT_BACKOFF_FACTOR)
+                bucket["tokens"] = min(bucket["tokens"], 0.0)
+                if retry_after and retry_after.strip().isdigit():
+                    bucket["blocked_until"] = max(bucket["blocked_until"], now + int(retry_after))
+                rate = bucket["rate"]
+            else:
+                bucket["rate"] = min(base, bucket["rate"] + RATE_LIMIT_RECOVERY_STEP)
+                return
+        with self._lock:
+            self.counts["backoffs"] += 1
+        reason = f"HTTP {status}" if throttled else f"slow response ({elapsed:.1f}s)"
+        logger.warning(f"⏳ Rate limit: {reason} from {host} - slowing to {rate:.2f} req/s")
+
+    def stats(self) -> dict:
+        """Request, wait and backoff counts of this process."""
+        with self._lock:
+            return {
+                **self.counts,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "max_wait_seconds": round(self.max_wait, 3),
+            }
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def configure(host_rates: Optional[Dict[str, float]] = None,
+              default_rate: float = RATE_LIMIT_DEFAULT_RPS,
+              state_path: Optional[Path] = DEFAULT_STATE_PATH) -> RateLimiter:
+    """Enable the process-wide limiter used by page loads and HTTP fetches."""
+    global _limiter
+    _limiter = RateLimiter(host_rates, default_rate, state_path=state_path)
+    return _limiter
+
+
+def get_limiter() -> Optional[RateLimiter]:
+    """The process-wide limiter, or None when rate limiting is disabled."""
+    return _limiter
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Per-product perceptual hash index for LINE STORE Sticker Capture Tool.
+
+Each captured product directory gets an index.json holding, per sticker
+position, a 64-bit DCT perceptual hash together with the source URL and ETag
+of the sticker image. The index is used by `grab_stickers.py --refresh` to
+re-capture only the positions that changed, and can report near-duplicate
+stickers across products.
+
+Hashes are computed for a whole pack at once: all stickers are decoded to
+32x32 grayscale, stacked into a single array and transformed together.
+"""
+
+import argparse
+import io
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import PHASH_CHANGE_THRESHOLD, PHASH_DUPLICATE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.json"
+INDEX_VERSION = 1
+
+_HASH_SIZE = 8
+_SAMPLE_SIZE = 32
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix of size n x n."""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0, :] = np.sqrt(1.0 / n)
+    return matrix
+
+
+_DCT = _dct_matrix(_SAMPLE_SIZE)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _load_grayscale(data: bytes) -> np.ndarray:
+    """Decode PNG bytes to a 32x32 grayscale array, flattening alpha onto white."""
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGBA")
+        background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img).convert("L")
+        img = img.resize((_SAMPLE_SIZE, _SAMPLE_SIZE), Image.LANCZOS)
+        return np.asarray(img, dtype=np.float32)
+
+
+def compute_phashes(images: Sequence[bytes]) -> List[str]:
+    """
+    Compute perceptual hashes for a batch of PNG images.
+    Returns one 16-character hex string per image, in input order.
+    """
+    if not images:
+        return []
+
+    stack = np.stack([_load_grayscale(data) for data in images])
+    coeffs = _DCT @ stack @ _DCT.T
+    low = coeffs[:, :_HASH_SIZE, :_HASH_SIZE].reshape(len(images), -1)
+
+    # Median excluding the DC term, which only reflects overall brightness
+    medians = np.median(low[:, 1:], axis=1, keepdims=True)
+    bits = np.packbits(low > medians, axis=1)
+    return [row.tobytes().hex() for row in bits]
+
+
+def _hashes_to_array(hashes: Iterable[str]) -> np.ndarray:
+    """Convert hex hashes to an (N, 8) uint8 array."""
+    rows = [np.frombuffer(bytes.fromhex(h), dtype=np.uint8) for h in hashes]
+    if not rows:
+        return np.zeros((0, _HASH_SIZE), dtype=np.uint8)
+    return np.stack(rows)
+
+
+def hamming_distance(a: str, b: str) -> int:
+    """Number of differing bits between two hex hashes."""
+    return int(_POPCOUNT[_hashes_to_array([a]) ^ _hashes_to_array([b])].sum())
+
+
+def pairwise_distances(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Hamming distance matrix between two (N, 8) and (M, 8) uint8 hash arrays."""
+    xor = left[:, None, :] ^ right[None, :, :]
+    return _POPCOUNT[xor].sum(axis=2, dtype=np.uint16)
+
+
+class StickerIndex:
+    """Per-product index of sticker hashes, source URLs and ETags."""
+
+    def __init__(self, product_id: str, entries: Optional[Dict[int, dict]] = None):
+        self.product_id = product_id
+        self.entries: Dict[int, dict] = entries or {}
+
+    @classmethod
+    def load(cls, output_dir: Path) -> Optional["StickerIndex"]:
+        """Load the index of a product directory, or None if it has none."""
+        path = Path(output_dir) / INDEX_FILENAME
+        if not path.exists():
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read sticker index {path}: {e}")
+            return None
+        entries = {int(k): v for k, v in data.get("stickers", {}).items()}
+        return cls(data.get("product_id", ""), entries)
+
+    def save(self, output_dir: Path) -> None:
+        """Write the index to the product directory."""
+        path = Path(output_dir) / INDEX_FILENAME
+        data = {
+            "version": INDEX_VERSION,
+            "product_id": self.product_id,
+            "updated": datetime.now().isoformat(),
+            "stickers": {str(k): self.entries[k] for k in sorted(self.entries)},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        logger.debug(f"Sticker index saved: {path}")
+
+    def update(self, stickers: Sequence, hashes: Optional[Sequence[str]] = None) -> None:
+        """Record StickerImage entries, hashing those without a hash unless hashes are given."""
+        if hashes is None:
+            hashes = [s.phash for s in stickers]
+            if not all(hashes):
+                hashes = compute_phashes([s.read() for s in stickers])
+        for sticker, phash in zip(stickers, hashes):
+            self.entries[sticker.index] = {
+                "file": sticker.filename,
+                "phash": phash,
+                "src": sticker.src,
+                "etag": sticker.etag,
+            }
+
+    def changed_positions(self, current: Dict[int, Tuple[Optional[str], Optional[str]]]) -> Set[int]:
+        """
+        Positions whose (src, etag) differ from the index, or that are new.
+        An ETag that was not observed on either side is not treated as a change.
+        A position without a known src is always re-captured; its perceptual
+        hash then decides whether it changed.
+        """
+        changed = set()
+        for index, (src, etag) in current.items():
+            entry = self.entries.get(index)
+            if entry is None or src is None or entry.get("src") != src:
+                changed.add(index)
+            elif etag and entry.get("etag") and entry["etag"] != etag:
+                changed.add(index)
+        return changed
+
+    def unchanged_images(self, stickers: Sequence, hashes: Sequence[str],
+                         threshold: int = PHASH_CHANGE_THRESHOLD) -> Set[int]:
+        """Indexes of re-captured stickers whose pixels still match the stored hash."""
+        unchanged = set()
+        for sticker, phash in zip(stickers, hashes):
+            entry = self.entries.get(sticker.index)
+            if entry and entry.get("phash") and hamming_distance(entry["phash"], phash) <= threshold:
+                unchanged.add(sticker.index)
+        return unchanged
+
+
+def find_near_duplicates(root: Path, threshold: int = PHASH_DUPLICATE_THRESHOLD,
+                         chunk_size: int = 256) -> List[Tuple[str, int, str, int, int]]:
+    """
+    Find near-duplicate stickers across all product indexes under root.
+    Returns (product_a, index_a, product_b, index_b, distance) tuples.
+    """
+    keys: List[Tuple[str, int]] = []
+    hashes: List[str] = []
+    for path in sorted(Path(root).glob(f"*/{INDEX_FILENAME}")):
+        index = StickerIndex.load(path.parent)
+        if index is None:
+            continue
+        product_id = index.product_id or path.parent.name
+        for position, entry in sorted(index.entries.items()):
+            if entry.get("phash"):
+                keys.append((product_id, position))
+                hashes.append(entry["phash"])
+
+    matrix = _hashes_to_array(hashes)
+    products = np.array([k[0] for k in keys])
+    duplicates = []
+
+    # Compare in row chunks to keep the distance matrix bounded
+    for start in range(0, len(keys), chunk_size):
+        block = pairwise_distances(matrix[start:start + chunk_size], matrix)
+        rows, cols = np.nonzero(block <= threshold)
+        for r, c in zip(rows, cols):
+            i = start + int(r)
+            j = int(c)
+            if j <= i or products[i] == products[j]:
+                continue
+            duplicates.append((keys[i][0], keys[i][1], keys[j][0], keys[j][1], int(block[r, c])))
+
+    return duplicates
+
+
+def main():
+    """Report near-duplicate stickers across captured products."""
+    parser = argparse.ArgumentParser(
+        description="Find near-duplicate stickers across captured products"
+    )
+    parser.add_argument(
+        "root",
+        nargs="?",
+        default="output",
+        help="Directory containing <product_id>/index.json files (default: ./output)"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=PHASH_DUPLICATE_THRESHOLD,
+        help=f"Maximum Hamming distance to report (default: {PHASH_DUPLICATE_THRESHOLD})"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    for product_a, index_a, product_b, index_b, distance in find_near_duplicates(Path(args.root), args.threshold):
+        print(f"{product_a}/{index_a:04d}.png ~ {product_b}/{index_b:04d}.png (distance {distance})")
+
+
+if __name__ == "__main__":
+    main()
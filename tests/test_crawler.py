@@ -0,0 +1,52 @@
+"""Crawler paging, deduplication and stop behaviour against local fixture listings."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from crawler import Crawler, Frontier  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "listing"
+LISTING_URL = (FIXTURES / "author_{page}.html").as_uri().replace("%7Bpage%7D", "{page}")
+
+
+class CountingCrawler(Crawler):
+    """Crawler that records the listing pages it fetched."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetched = []
+
+    def fetch_listing(self, url):
+        self.fetched.append(Path(url).name)
+        return super().fetch_listing(url)
+
+
+def test_crawl_pages_until_listing_ends(tmp_path):
+    crawler = CountingCrawler(Frontier(tmp_path / "frontier.json"), page_delay=0)
+
+    assert list(crawler.crawl(LISTING_URL)) == ["1001", "1002", "1003", "1004", "1005"]
+    assert crawler.fetched == ["author_1.html", "author_2.html", "author_3.html"]
+
+
+def test_second_crawl_stops_on_first_page_without_new_products(tmp_path):
+    frontier_path = tmp_path / "frontier.json"
+    list(CountingCrawler(Frontier(frontier_path), page_delay=0).crawl(LISTING_URL))
+
+    frontier = Frontier(frontier_path)
+    assert frontier.seen == {"1001", "1002", "1003", "1004", "1005"}
+    assert frontier.pending == ["1001", "1002", "1003", "1004", "1005"]
+
+    crawler = CountingCrawler(frontier, page_delay=0)
+    assert list(crawler.crawl(LISTING_URL)) == []
+    assert crawler.fetched == ["author_1.html"]
+
+
+def test_full_crawl_finds_products_behind_a_known_page(tmp_path):
+    frontier = Frontier(tmp_path / "frontier.json")
+    for product_id in ("1001", "1002", "1003"):
+        frontier.add(product_id)
+
+    assert list(CountingCrawler(frontier, page_delay=0).crawl(LISTING_URL)) == []
+    assert list(CountingCrawler(frontier, page_delay=0, full=True).crawl(LISTING_URL)) == ["1004", "1005"]
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Capture verification for LINE STORE Sticker Capture Tool.
+
+Loads all captured images of a pack as arrays and checks them together for
+typical bad captures:
+
+- blank: fully transparent or (almost) entirely white
+- uniform: a single flat colour, e.g. an image that had not loaded yet
+- undersized: smaller than VERIFY_MIN_SIZE_PX in either dimension
+- clipped: noticeably smaller than the rest of the pack
+- overlay: dimmed by a semi-transparent popup overlay
+- popup: captured while a popup could not be dismissed, so the image is suspect
+
+Per-image statistics are computed on one stacked array so a pack is
+checked in a single vectorized pass.
+"""
+
+import argparse
+import io
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+from PIL import Image
+
+from config import (
+    VERIFY_BLANK_FRACTION,
+    VERIFY_CLIP_RATIO,
+    VERIFY_MIN_SIZE_PX,
+    VERIFY_OVERLAY_DELTA,
+    VERIFY_UNIFORM_STD,
+)
+
+logger = logging.getLogger(__name__)
+
+_SAMPLE_SIZE = 64
+_BORDER = 4
+
+
+def _load_rgba(data: bytes) -> tuple:
+    """Decode PNG bytes to ((width, height), 64x64 RGBA sample)."""
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGBA")
+        size = img.size
+        sample = img.resize((_SAMPLE_SIZE, _SAMPLE_SIZE), Image.BILINEAR)
+        return size, np.asarray(sample, dtype=np.float32)
+
+
+def check_images(images: Iterable[bytes], popup_closed: bool = True,
+                 background: Sequence[float] = (255.0, 255.0, 255.0)) -> List[List[str]]:
+    """
+    Check a pack of PNG images. Returns, in input order, the list of
+    problems found for each image (an empty list means the image looks fine).
+    With popup_closed=False every readable image is flagged as "popup".
+    background is the RGB colour of the page behind the stickers.
+    images may be a generator; only downscaled samples are kept in memory.
+    """
+    flags: List[List[str]] = []
+    decoded = []
+    for i, data in enumerate(images):
+        flags.append([])
+        try:
+            decoded.append(_load_rgba(data))
+        except Exception as e:
+            logger.debug(f"Could not decode image {i}: {e}")
+            flags[i].append("unreadable")
+            decoded.append(((0, 0), np.zeros((_SAMPLE_SIZE, _SAMPLE_SIZE, 4), dtype=np.float32)))
+
+    if not decoded:
+        return []
+
+    sizes = np.array([size for size, _ in decoded], dtype=np.float32)
+    stack = np.stack([sample for _, sample in decoded])
+
+    # Luminance with transparency flattened onto the page background
+    weights = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    page_rgb = np.asarray(background, dtype=np.float32)
+    page_luminance = float(page_rgb @ weights)
+    alpha = stack[..., 3] / 255.0
+    rgb = stack[..., :3] * alpha[..., None] + page_rgb * (1.0 - alpha[..., None])
+    luminance = rgb @ weights
+    flat = luminance.reshape(len(decoded), -1)
+
+    transparent = alpha.reshape(len(decoded), -1).mean(axis=1) < 1.0 - VERIFY_BLANK_FRACTION
+    white = (flat > 250).mean(axis=1) >= VERIFY_BLANK_FRACTION
+    blank = transparent | white
+    uniform = ~blank & (flat.std(axis=1) < VERIFY_UNIFORM_STD)
+    undersized = (sizes < VERIFY_MIN_SIZE_PX).any(axis=1)
+
+    readable = sizes.min(axis=1) > 0
+    # An overlay darkens the page background around the sticker, and with it the
+    # brightest pixels, so the border stays about as bright as the brightest pixels.
+    # A sticker with its own dark background has a border far below its highlights
+    ring = np.ones((_SAMPLE_SIZE, _SAMPLE_SIZE), dtype=bool)
+    ring[_BORDER:-_BORDER, _BORDER:-_BORDER] = False
+    border = luminance[:, ring].mean(axis=1)
+    brightest = np.percentile(flat, 99, axis=1)
+    dimmed = (brightest < page_luminance - VERIFY_OVERLAY_DELTA / 2) & \
+        (border > brightest - VERIFY_OVERLAY_DELTA / 2)
+    # Full-bleed stickers can still look dimmed on their own, so the check against
+    # the page background only counts when most of the pack is dimmed (a pack-wide tint)
+    tinted = readable & ~blank & dimmed & (border < page_luminance - VERIFY_OVERLAY_DELTA)
+    candidates = readable & ~blank
+    overlay = tinted if tinted.sum() > candidates.sum() / 2 else np.zeros(len(decoded), dtype=bool)
+
+    clipped = np.zeros(len(decoded), dtype=bool)
+    if readable.sum() >= 3:
+        # Compare against the rest of the pack, which is normally uniform in size
+        median_size = np.median(sizes[readable], axis=0)
+        clipped = readable & ~undersized & (sizes < VERIFY_CLIP_RATIO * median_size).any(axis=1)
+
+        # Also compare against the rest of the pack, for stickers on a darker background
+        median_border = np.median(border[readable])
+        overlay |= readable & ~blank & dimmed & (border < median_border - VERIFY_OVERLAY_DELTA)
+
+    popup = np.full(len(decoded), not popup_closed)
+    for name, mask in (("blank", blank), ("uniform", uniform), ("undersized", undersized),
+                       ("clipped", clipped), ("overlay", overlay), ("popup", popup)):
+        for i in np.nonzero(mask & readable)[0]:
+            flags[int(i)].append(name)
+    return flags
+
+
+def verify_stickers(stickers: Sequence, popup_closed: bool = True,
+                    background: Sequence[float] = (255.0, 255.0, 255.0)) -> Dict[int, List[str]]:
+    """Check StickerImage objects and set their status/flags. Returns flags by index."""
+    results = check_images((s.read() for s in stickers), popup_closed, background)
+    for sticker, flags in zip(stickers, results):
+        sticker.flags = flags
+        sticker.status = "flagged" if flags else "ok"
+    return {s.index: flags for s, flags in zip(stickers, results)}
+
+
+def verify_directory(output_dir: Path) -> Dict[int, List[str]]:
+    """Verify the PNG files of a capture directory and record the result in meta.json."""
+    meta_path = output_dir / "meta.json"
+    metadata = {}
+    if meta_path.exists():
+        with open(meta_path, encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    files = sorted(p for p in output_dir.glob("[0-9][0-9][0-9][0-9].png"))
+    results = check_images(p.read_bytes() for p in files)
+    flags_by_index = {int(p.stem): flags for p, flags in zip(files, results)}
+
+    if metadata.get("stickers"):
+        for entry in metadata["stickers"]:
+            flags = flags_by_index.get(entry.get("index"))
+            if flags is not None:
+                entry["status"] = "flagged" if flags else "ok"
+                entry["flags"] = flags
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+    return flags_by_index
+
+
+def main():
+    """Verify previously captured product directories."""
+    parser = argparse.ArgumentParser(
+        description="Detect blank, clipped or overlay-contaminated sticker captures"
+    )
+    parser.add_argument("dirs", nargs="+", help="Product output directories to verify")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    flagged_total = 0
+    for directory in args.dirs:
+        results = verify_directory(Path(directory))
+        flagged = {i: f for i, f in results.items() if f}
+        flagged_total += len(flagged)
+        for index, flags in sorted(flagged.items()):
+            logger.warning(f"{directory}/{index:04d}.png: {', '.join(flags)}")
+        logger.info(f"{directory}: {len(results) - len(flagged)}/{len(results)} images OK")
+
+    sys.exit(1 if flagged_total else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Watch mode for LINE STORE Sticker Capture Tool.
+
+Cycles through a list of products on a fixed interval and runs the full
+capture pipeline only for products that changed. Each product is first
+checked cheaply: a conditional request on the product page, then a
+comparison of the sticker image URLs in the page HTML against the last
+meta.json. Changed products are re-captured with --refresh semantics so
+only the changed stickers are rewritten.
+"""
+
+import argparse
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from grab_stickers import (
+    PRODUCT_URL_PREFIX,
+    CaptureError,
+    CaptureOptions,
+    capture_product,
+    extract_product_id,
+)
+from http_cache import http_get
+import rate_limit
+
+logger = logging.getLogger(__name__)
+
+STATE_FILENAME = "watch_state.json"
+STORE_HOST = "store.line.me"
+
+# Sticker image URLs as they appear in the product page HTML
+STICKER_URL_PATTERN = re.compile(
+    r'https://stickershop\.line-scdn\.net/stickershop/v\d+/sticker/(\d+)/[^"\'\s)&;?]+(?:\?v=(\d+))?'
+)
+
+
+def read_product_list(path: Path) -> List[str]:
+    """Read product URLs or bare product IDs, one per line; # starts a comment."""
+    urls = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        entry = line.split("#", 1)[0].strip()
+        if not entry:
+            continue
+        if entry.isdigit():
+            entry = f"{PRODUCT_URL_PREFIX}{entry}/ja"
+        if not extract_product_id(entry):
+            logger.warning(f"Skipping invalid product entry: {entry}")
+            continue
+        urls.append(entry)
+    return urls
+
+
+def sticker_keys_from_html(html: str) -> Set[Tuple[str, str]]:
+    """Extract (sticker_id, version) pairs from product page HTML."""
+    return {(m.group(1), m.group(2) or "") for m in STICKER_URL_PATTERN.finditer(html)}
+
+
+def sticker_keys_from_metadata(output_dir: Path) -> Optional[Set[Tuple[str, str]]]:
+    """
+    Extract (sticker_id, version) pairs from the last meta.json.
+    Returns None when they are unknown (no capture, or no recognisable sticker URLs).
+    """
+    meta_path = output_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if "stickers" not in metadata:
+        return None
+    keys = sticker_keys_from_html(" ".join(s.get("src") or "" for s in metadata["stickers"]))
+    return keys or None
+
+
+class Watcher:
+    """Periodically re-check products and capture the ones that changed."""
+
+    def __init__(self, urls: List[str], outdir: Path, options: CaptureOptions,
+                 rate: float = 1.0, concurrency: int = 2):
+        self.urls = urls
+        self.outdir = Path(outdir)
+        self.options = options
+        # Product page checks and captures share the store host's request budget
+        self.limiter = rate_limit.configure(host_rates={STORE_HOST: rate})
+        self.concurrency = max(1, concurrency)
+        self.state_path = self.outdir / STATE_FILENAME
+        self._state_lock = threading.Lock()
+        self.state: Dict[str, dict] = self._load_state()
+
+    def _load_state(self) -> Dict[str, dict]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read watch state: {e}")
+            return {}
+
+    def _save_state(self) -> None:
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        with self._state_lock:
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2, ensure_ascii=False)
+
+    def has_changed(self, url: str, product_id: str) -> Tuple[bool, Dict[str, Optional[str]]]:
+        """
+        Cheap change detection for one product.
+        Returns (changed, validators) where validators are the product page's
+        ETag/Last-Modified and sticker keys to remember once the product is up to date.
+        """
+        entry = self.state.get(product_id, {})
+        captured = (self.outdir / product_id / "meta.json").exists()
+        if entry.get("sticker_keys"):
+            previous = {tuple(key) for key in entry["sticker_keys"]}
+        else:
+            previous = sticker_keys_from_metadata(self.outdir / product_id)
+
+        headers = {}
+        if captured:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        status, response_headers, body = http_get(url, headers)
+        if status == 304:
+            logger.debug(f"{product_id}: product page not modified")
+            return False, {key: entry.get(key) for key in ("etag", "last_modified", "sticker_keys")}
+
+        current = sticker_keys_from_html(body.decode("utf-8", errors="replace"))
+        validators = {
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "sticker_keys": sorted(current) or None,
+        }
+        if not captured:
+            logger.debug(f"{product_id}: no previous capture")
+            return True, validators
+        if not current or previous is None:
+            # Sticker lists cannot be compared; refresh, which rewrites only changed pixels
+            logger.debug(f"{product_id}: sticker URLs unknown, refreshing")
+            return True, validators
+        return current != previous, validators
+
+    def check_product(self, url: str) -> str:
+        """Check one product and capture it if it changed. Returns the outcome."""
+        product_id = extract_product_id(url)
+        try:
+            changed, validators = self.has_changed(url, product_id)
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning(f"{product_id}: change check failed: {e}")
+            return "error"
+
+        if changed:
+            logger.info(f"🔄 {product_id}: change detected - capturing")
+            options = replace(self.options, output_dir=str(self.outdir / product_id), refresh=True)
+            try:
+                capture_product(url, options)
+            except CaptureError as e:
+                logger.warning(f"{product_id}: capture failed: {e}")
+                return "error"
+            except Exception as e:
+                logger.warning(f"{product_id}: unexpected capture error: {e}")
+                return "error"
+
+        # Validators are only remembered once the capture is up to date
+        with self._state_lock:
+            entry = self.state.setdefault(product_id, {})
+            entry.update(validators)
+            entry["last_check"] = datetime.now().isoformat()
+            if changed:
+                entry["last_change"] = entry["last_check"]
+        return "captured" if changed else "unchanged"
+
+    def run_cycle(self) -> Dict[str, int]:
+        """Check every product once with bounded concurrency."""
+        urls = list(self.urls)
+        random.shuffle(urls)
+        counts = {"unchanged": 0, "captured": 0, "error": 0}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for outcome in executor.map(self.check_product, urls):
+                counts[outcome] += 1
+        self._save_state()
+        return counts
+
+    def run(self, interval: float, jitter: float = 0.1, once: bool = False) -> None:
+        """Run cycles until interrupted, sleeping interval +/- jitter in between."""
+        while True:
+            started = time.monotonic()
+            counts = self.run_cycle()
+            elapsed = time.monotonic() - started
+            logger.info(f"Cycle done in {elapsed:.1f}s: {counts['captured']} captured, "
+                        f"{counts['unchanged']} unchanged, {counts['error']} errors")
+            stats = self.limiter.stats()
+            logger.info(f"Rate limit: {stats['requests']} requests, waited {stats['wait_seconds']:.1f}s "
+                        f"in total ({stats['backoffs']} backoffs)")
+            if once:
+                return
+            sleep_seconds = max(0.0, interval * (1 + random.uniform(-jitter, jitter)) - elapsed)
+            logger.info(f"Next cycle in {sleep_seconds:.0f}s")
+            time.sleep(sleep_seconds)
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description="Periodically re-check LINE STORE products and capture the changed ones",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python watch.py products.txt
+  python watch.py products.txt --interval 21600 --rate 0.5 --concurrency 4
+  python watch.py products.txt --once
+
+The product list contains one product URL or product ID per line.
+        """
+    )
+    parser.add_argument("products", help="File with product URLs or IDs, one per line")
+    parser.add_argument("-o", "--outdir", default="output",
+                        help="Root output directory (default: ./output)")
+    parser.add_argument("--interval", type=float, default=3600.0,
+                        help="Seconds between cycles (default: 3600)")
+    parser.add_argument("--jitter", type=float, default=0.1,
+                        help="Random +/- fraction applied to the interval (default: 0.1)")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help=f"Maximum requests per second to {STORE_HOST}, shared by all workers and "
+                             "other running captures (default: 1.0)")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help="Maximum products checked at the same time (default: 2)")
+    parser.add_argument("--once", action="store_true", help="Run a single cycle and exit")
+    parser.add_argument("--browser", choices=["chromium", "firefox", "webkit", "auto"], default="chromium",
+                        help="Browser to use for captures (default: chromium)")
+    parser.add_argument("--delay", type=float, default=2.0,
+                        help="Extra wait time after page load in seconds (default: 2.0)")
+    parser.add_argument("--cache-dir",
+                        help="Directory of the on-disk HTTP cache used by captures (default: no cache)")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose debug logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    urls = read_product_list(Path(args.products))
+    if not urls:
+        logger.error("No valid products in list")
+        sys.exit(1)
+
+    logger.info(f"Watching {len(urls)} products every {args.interval:.0f}s")
+    watcher = Watcher(
+        urls,
+        Path(args.outdir),
+        CaptureOptions(browser=args.browser, delay=args.delay, cache_dir=args.cache_dir),
+        rate=args.rate,
+        concurrency=args.concurrency,
+    )
+    try:
+        watcher.run(args.interval, args.jitter, args.once)
+    except KeyboardInterrupt:
+        logger.info("Watch stopped by user")
+
+
+if __name__ == "__main__":
+    main()